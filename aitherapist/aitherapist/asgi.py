@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aitherapist.settings')
 
 application = get_asgi_application()
+
+# Start loading the sentiment model in the background once the app is built.
+# Only server entry points do this; manage.py commands never import torch.
+from core.ai_therapist import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -150,3 +150,186 @@ EMAIL_HOST_PASSWORD = 'wdle mmnp midm hccx'  #Gmail App Password
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER  #useS Gmail address as sender
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Sentiment analysis
+# The model loads in a background thread when the WSGI/ASGI app starts;
+# messages that arrive before it is ready are scored as neutral.
+SENTIMENT_WARMUP_ON_START = os.getenv('SENTIMENT_WARMUP_ON_START', 'true').lower() == 'true'
+
+# Concurrent sentiment requests are micro-batched into one forward pass:
+# up to SENTIMENT_BATCH_MAX_SIZE texts, waiting at most SENTIMENT_BATCH_MAX_WAIT_MS.
+# Set SENTIMENT_BATCH_MAX_SIZE to 1 to score every message on its own.
+SENTIMENT_BATCH_MAX_SIZE = int(os.getenv('SENTIMENT_BATCH_MAX_SIZE', '16'))
+SENTIMENT_BATCH_MAX_WAIT_MS = float(os.getenv('SENTIMENT_BATCH_MAX_WAIT_MS', '5'))
+SENTIMENT_BATCH_QUEUE_SIZE = int(os.getenv('SENTIMENT_BATCH_QUEUE_SIZE', '256'))
+SENTIMENT_BATCH_TIMEOUT = float(os.getenv('SENTIMENT_BATCH_TIMEOUT', '10'))
+
+# Sentiment results are cached per process by normalized message text (LRU + TTL).
+# Point SENTIMENT_CACHE_ALIAS at a shared CACHES entry (e.g. memcached/redis on
+# the node) to share results across workers.
+SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', '2048'))
+SENTIMENT_CACHE_TTL = int(os.getenv('SENTIMENT_CACHE_TTL', '3600'))
+SENTIMENT_CACHE_ALIAS = os.getenv('SENTIMENT_CACHE_ALIAS') or None
+
+# Sentiment inference backend: 'pytorch' (fp32 reference), 'pytorch-int8'
+# (dynamic quantization) or 'onnx' (ONNX Runtime, needs optimum[onnxruntime]).
+# Check a candidate with: python manage.py verify_sentiment_backend <backend>
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'pytorch')
+SENTIMENT_ONNX_DIR = BASE_DIR / 'models' / 'sentiment-onnx'
+
+# Optional shared inference server (python manage.py run_sentiment_server).
+# e.g. 'unix:/run/aitherapist/sentiment.sock' or 'tcp://127.0.0.1:8765'.
+# When set, web workers score through it and only load the model themselves
+# if it is unreachable (retrying the server every SENTIMENT_SERVER_RETRY_INTERVAL s);
+# a request that times out gets the neutral fallback and is not re-sent. The
+# server has no authentication, so it only listens on loopback or a unix socket
+# unless started with --allow-remote.
+SENTIMENT_SERVER_ADDRESS = os.getenv('SENTIMENT_SERVER_ADDRESS') or None
+SENTIMENT_SERVER_CONNECT_TIMEOUT = float(os.getenv('SENTIMENT_SERVER_CONNECT_TIMEOUT', '0.5'))
+SENTIMENT_SERVER_TIMEOUT = float(os.getenv('SENTIMENT_SERVER_TIMEOUT', '5'))
+SENTIMENT_SERVER_RETRY_INTERVAL = float(os.getenv('SENTIMENT_SERVER_RETRY_INTERVAL', '30'))
+
+# Sentiment cascade: the lexicon scorer answers when its confidence is at least
+# this; everything else is escalated to the transformer. Set above 1 to disable.
+SENTIMENT_LEXICON_THRESHOLD = float(os.getenv('SENTIMENT_LEXICON_THRESHOLD', '0.9'))
+
+# Messages longer than the model's 512-token limit are scored as overlapping
+# windows (SENTIMENT_WINDOW_OVERLAP tokens of overlap), at most
+# SENTIMENT_MAX_WINDOWS per message. The model runs at most
+# SENTIMENT_PIPELINE_BATCH_SIZE windows per forward pass, which bounds peak memory.
+SENTIMENT_MAX_WINDOWS = int(os.getenv('SENTIMENT_MAX_WINDOWS', '8'))
+SENTIMENT_WINDOW_OVERLAP = int(os.getenv('SENTIMENT_WINDOW_OVERLAP', '64'))
+SENTIMENT_PIPELINE_BATCH_SIZE = int(os.getenv('SENTIMENT_PIPELINE_BATCH_SIZE', '32'))
+
+# Gemini client: key/model files and env vars are re-checked (stat only) at most
+# this often; changes are picked up without restarting the workers.
+GEMINI_CONFIG_CHECK_INTERVAL = float(os.getenv('GEMINI_CONFIG_CHECK_INTERVAL', '5'))
+
+# Conversation memory: the prompt carries the newest turns that fit in
+# CONTEXT_TOKEN_BUDGET (at most CONTEXT_MAX_TURNS); older turns are folded into
+# a rolling summary in the background once CONTEXT_SUMMARY_BATCH of them pile up.
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1500'))
+CONTEXT_MAX_TURNS = int(os.getenv('CONTEXT_MAX_TURNS', '20'))
+CONTEXT_SUMMARY_BATCH = int(os.getenv('CONTEXT_SUMMARY_BATCH', '4'))
+CONTEXT_SUMMARY_MAX_TURNS = int(os.getenv('CONTEXT_SUMMARY_MAX_TURNS', '40'))
+CONTEXT_SUMMARY_MAX_WORDS = int(os.getenv('CONTEXT_SUMMARY_MAX_WORDS', '200'))
+
+# Chat window history: the page renders the newest CHAT_HISTORY_PAGE_SIZE turns
+# and chat.js loads older ones, a page at a time, as the user scrolls up.
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv('CHAT_HISTORY_PAGE_SIZE', '20'))
+
+# The therapist instructions are sent as the model's system instruction and,
+# when GEMINI_PROMPT_CACHE is on, registered once per worker as Gemini cached
+# content that lives GEMINI_PROMPT_CACHE_TTL seconds (renewed halfway through).
+# Models whose cache minimum the instructions don't reach (e.g. 1024 tokens on
+# gemini-2.5-flash) skip that and rely on Gemini's implicit caching.
+GEMINI_PROMPT_CACHE = os.getenv('GEMINI_PROMPT_CACHE', 'true').lower() == 'true'
+GEMINI_PROMPT_CACHE_TTL = int(os.getenv('GEMINI_PROMPT_CACHE_TTL', '3600'))
+
+# LLM behind the chat: 'gemini' or 'local' (offline deterministic stand-in for
+# tests and load tests). The LOCAL_LLM_* settings shape the stand-in: time to
+# first chunk (LOCAL_LLM_LATENCY_MS, drawn from fixed / uniform / normal /
+# lognormal / exponential with LOCAL_LLM_LATENCY_JITTER_MS spread), failure
+# rate, and streaming cadence.
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini')
+LOCAL_LLM_LATENCY_MS = float(os.getenv('LOCAL_LLM_LATENCY_MS', '800'))
+LOCAL_LLM_LATENCY_DISTRIBUTION = os.getenv('LOCAL_LLM_LATENCY_DISTRIBUTION', 'fixed')
+LOCAL_LLM_LATENCY_JITTER_MS = float(os.getenv('LOCAL_LLM_LATENCY_JITTER_MS', '0'))
+LOCAL_LLM_ERROR_RATE = float(os.getenv('LOCAL_LLM_ERROR_RATE', '0'))
+LOCAL_LLM_CHUNK_CHARS = int(os.getenv('LOCAL_LLM_CHUNK_CHARS', '40'))
+LOCAL_LLM_CHUNK_INTERVAL_MS = float(os.getenv('LOCAL_LLM_CHUNK_INTERVAL_MS', '30'))
+LOCAL_LLM_SEED = int(os.getenv('LOCAL_LLM_SEED', '0'))
+
+# Seconds a chat request may wait for the LLM. Past that (or on an LLM error)
+# the call is cancelled and the local template engine answers instead.
+LLM_LATENCY_BUDGET = float(os.getenv('LLM_LATENCY_BUDGET', '20'))
+
+# Gemini call resilience. Every attempt has a GEMINI_READ_TIMEOUT deadline (cut
+# to what is left of LLM_LATENCY_BUDGET; keep it below the budget so a timed-out
+# attempt leaves room for a retry) and streams must start within
+# GEMINI_CONNECT_TIMEOUT. Rate-limit / server errors
+# and timeouts are retried up to GEMINI_MAX_RETRIES times with full-jitter
+# exponential backoff (GEMINI_BACKOFF_BASE doubling, capped at GEMINI_BACKOFF_MAX).
+# GEMINI_BREAKER_THRESHOLD consecutive failures open the circuit: calls fail
+# fast for GEMINI_BREAKER_RESET_TIMEOUT seconds, then one probe is let through.
+GEMINI_CONNECT_TIMEOUT = float(os.getenv('GEMINI_CONNECT_TIMEOUT', '5'))
+GEMINI_READ_TIMEOUT = float(os.getenv('GEMINI_READ_TIMEOUT', '12'))
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '2'))
+GEMINI_BACKOFF_BASE = float(os.getenv('GEMINI_BACKOFF_BASE', '0.5'))
+GEMINI_BACKOFF_MAX = float(os.getenv('GEMINI_BACKOFF_MAX', '4'))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv('GEMINI_BREAKER_THRESHOLD', '5'))
+GEMINI_BREAKER_RESET_TIMEOUT = float(os.getenv('GEMINI_BREAKER_RESET_TIMEOUT', '30'))
+# Model list used for 'model not found' diagnostics is refreshed at most this often
+GEMINI_MODEL_CATALOGUE_TTL = int(os.getenv('GEMINI_MODEL_CATALOGUE_TTL', '3600'))
+
+# Model routing: each message goes to the 'fast', 'standard' (the configured
+# model) or 'strong' tier, each with its own output budget. Short check-ins
+# early in a conversation go fast; long messages and high-intensity distress go
+# strong. A tier whose model's rolling p95 latency exceeds GEMINI_ROUTER_P95_LIMIT
+# seconds is stepped down to the next faster tier. The p95 covers the last
+# GEMINI_ROUTER_LATENCY_WINDOW calls from the past GEMINI_ROUTER_LATENCY_MAX_AGE
+# seconds, so a stepped-down tier is retried once its slow samples age out.
+GEMINI_ROUTING = os.getenv('GEMINI_ROUTING', 'true').lower() == 'true'
+GEMINI_FAST_MODEL = os.getenv('GEMINI_FAST_MODEL', 'gemini-2.5-flash-lite')
+GEMINI_STRONG_MODEL = os.getenv('GEMINI_STRONG_MODEL', 'gemini-2.5-pro')
+GEMINI_FAST_MAX_TOKENS = int(os.getenv('GEMINI_FAST_MAX_TOKENS', '768'))
+GEMINI_STANDARD_MAX_TOKENS = int(os.getenv('GEMINI_STANDARD_MAX_TOKENS', '2048'))
+GEMINI_STRONG_MAX_TOKENS = int(os.getenv('GEMINI_STRONG_MAX_TOKENS', '4096'))
+GEMINI_ROUTER_SHORT_TOKENS = int(os.getenv('GEMINI_ROUTER_SHORT_TOKENS', '16'))
+GEMINI_ROUTER_LONG_TOKENS = int(os.getenv('GEMINI_ROUTER_LONG_TOKENS', '200'))
+GEMINI_ROUTER_DEEP_TURNS = int(os.getenv('GEMINI_ROUTER_DEEP_TURNS', '8'))
+GEMINI_ROUTER_DISTRESS_CONFIDENCE = float(os.getenv('GEMINI_ROUTER_DISTRESS_CONFIDENCE', '0.8'))
+GEMINI_ROUTER_P95_LIMIT = float(os.getenv('GEMINI_ROUTER_P95_LIMIT', '12'))
+GEMINI_ROUTER_LATENCY_WINDOW = int(os.getenv('GEMINI_ROUTER_LATENCY_WINDOW', '200'))
+GEMINI_ROUTER_LATENCY_MAX_AGE = float(os.getenv('GEMINI_ROUTER_LATENCY_MAX_AGE', '300'))
+
+# Cache for state all workers share: admission slots, idempotency keys and
+# dashboard invalidation stamps. Set REDIS_URL (e.g. redis://127.0.0.1:6379/1,
+# needs the redis package) whenever more than one worker or process runs;
+# without it each process gets its own local-memory cache and the core.W001
+# system check warns.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Admission control for LLM calls, shared across workers through the
+# ADMISSION_CACHE_ALIAS cache (use a shared backend such as redis/memcached in
+# production). Each user gets a token bucket of ADMISSION_USER_BURST messages
+# refilled at ADMISSION_USER_RATE per minute; the deployment runs at most
+# ADMISSION_MAX_CONCURRENT LLM calls, with ADMISSION_MAX_QUEUED more waiting up
+# to ADMISSION_QUEUE_TIMEOUT seconds. Shed requests get 429 + Retry-After.
+# A rate or concurrency limit of 0 disables it. Each claim tries at most
+# ADMISSION_CLAIM_PROBES slots (one cache round trip each).
+ADMISSION_CACHE_ALIAS = os.getenv('ADMISSION_CACHE_ALIAS', 'default')
+ADMISSION_USER_RATE = float(os.getenv('ADMISSION_USER_RATE', '20'))
+ADMISSION_USER_BURST = int(os.getenv('ADMISSION_USER_BURST', '5'))
+ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', '32'))
+ADMISSION_MAX_QUEUED = int(os.getenv('ADMISSION_MAX_QUEUED', '64'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '5'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '5'))
+ADMISSION_CLAIM_PROBES = int(os.getenv('ADMISSION_CLAIM_PROBES', '4'))
+
+# Idempotency-Key handling for the chat endpoints: completed responses are
+# replayed to duplicates for IDEMPOTENCY_TTL seconds. Use a cache shared by all
+# workers (redis/memcached) so duplicates landing on another worker are caught.
+IDEMPOTENCY_CACHE_ALIAS = os.getenv('IDEMPOTENCY_CACHE_ALIAS', 'default')
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
+
+# Each user's computed dashboard is cached for DASHBOARD_CACHE_TTL seconds (0
+# disables) and dropped whenever they chat. Use a cache shared by all workers
+# so an invalidation reaches every one of them; on a per-process cache entries
+# live at most DASHBOARD_LOCAL_CACHE_TTL seconds instead.
+DASHBOARD_CACHE_ALIAS = os.getenv('DASHBOARD_CACHE_ALIAS', 'default')
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '3600'))
+DASHBOARD_LOCAL_CACHE_TTL = int(os.getenv('DASHBOARD_LOCAL_CACHE_TTL', '30'))
@@ -25,8 +25,8 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(Chat)
 class ChatAdmin(admin.ModelAdmin):
-    list_display = ['user', 'get_message_preview', 'sentiment', 'confidence_score', 'timestamp']
-    list_filter = ['sentiment', 'timestamp', 'confidence_score']
+    list_display = ['user', 'get_message_preview', 'sentiment', 'confidence_score', 'engine', 'timestamp']
+    list_filter = ['sentiment', 'engine', 'timestamp', 'confidence_score']
     search_fields = ['user__username', 'user_message', 'ai_response']
     readonly_fields = ['timestamp', 'confidence_score']
     date_hierarchy = 'timestamp'
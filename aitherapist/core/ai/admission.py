@@ -0,0 +1,153 @@
+# core/ai/admission.py
+"""
+Admission control for LLM calls.
+
+Two limits guard the chat endpoints, both kept in the ADMISSION_CACHE_ALIAS
+cache so every worker shares them (use a shared backend such as redis or
+memcached in production; the default local-memory cache is per process):
+
+- a token bucket per user: ADMISSION_USER_BURST messages at once, refilled
+  at ADMISSION_USER_RATE per minute
+- a global concurrency limit of ADMISSION_MAX_CONCURRENT LLM calls, with at
+  most ADMISSION_MAX_QUEUED requests waiting up to ADMISSION_QUEUE_TIMEOUT
+  seconds for a slot
+
+Rejected requests raise AdmissionRejected carrying a Retry-After hint.
+
+Concurrency slots are cache keys claimed with the atomic add() and held on a
+lease, so a worker that dies mid-call can't leak a slot for longer than the
+lease. A claim probes at most ADMISSION_CLAIM_PROBES keys from a random start,
+so it costs a few cache round trips however large the limits are; near
+capacity it can miss a free key, which only sends the request to the queue
+(or sheds it) a little early.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+
+from ..shared_cache import SharedCacheMixin, request_lease
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'llm-admission'
+
+
+class AdmissionRejected(Exception):
+    """Request shed by admission control; retry_after is in whole seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class AdmissionController(SharedCacheMixin):
+
+    alias_setting = 'ADMISSION_CACHE_ALIAS'
+
+    async def acheck_user(self, user_id):
+        """Take one token from the user's bucket or raise AdmissionRejected"""
+        rate = getattr(settings, 'ADMISSION_USER_RATE', 20)
+        if rate <= 0:
+            return
+        burst = max(1, getattr(settings, 'ADMISSION_USER_BURST', 5))
+        interval = 60.0 / rate
+
+        key = f'{KEY_PREFIX}:user:{user_id}'
+        async with _KeyLock(self.cache, key):
+            # GCRA form of the token bucket: track the theoretical arrival time
+            # of the next token instead of a token count
+            now = time.time()
+            tat = max(await self.cache.aget(key, now), now)
+            wait = tat - now - interval * (burst - 1)
+            if wait > 0:
+                raise AdmissionRejected("You're sending messages too quickly.", wait)
+            tat += interval
+            await self.cache.aset(key, tat, timeout=math.ceil(tat - now) + 1)
+
+    async def aacquire(self):
+        """
+        Claim a global LLM slot, queueing for up to ADMISSION_QUEUE_TIMEOUT
+        seconds. Returns a slot to hand back to arelease().
+        """
+        max_concurrent = getattr(settings, 'ADMISSION_MAX_CONCURRENT', 32)
+        if max_concurrent <= 0:
+            return None
+        retry_after = getattr(settings, 'ADMISSION_RETRY_AFTER', 5)
+        lease = request_lease()
+
+        slot = await self._aclaim('slot', max_concurrent, lease)
+        if slot is not None:
+            return slot
+
+        queue_place = await self._aclaim('queue', getattr(settings, 'ADMISSION_MAX_QUEUED', 64), lease)
+        if queue_place is None:
+            raise AdmissionRejected("AItherapist is very busy right now.", retry_after)
+
+        try:
+            deadline = time.monotonic() + getattr(settings, 'ADMISSION_QUEUE_TIMEOUT', 5)
+            delay = 0.02
+            while time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                slot = await self._aclaim('slot', max_concurrent, lease)
+                if slot is not None:
+                    return slot
+                delay = min(delay * 2, 0.25)
+        finally:
+            await self.arelease(queue_place)
+
+        raise AdmissionRejected("AItherapist is very busy right now.", retry_after)
+
+    async def arelease(self, slot):
+        if slot is None:
+            return
+        key, token = slot
+        # Only free the slot if our lease on it hasn't expired and been re-claimed
+        if await self.cache.aget(key) == token:
+            await self.cache.adelete(key)
+
+    async def _aclaim(self, kind, size, lease):
+        """Claim one of `size` keys of this kind; (key, token) or None if none of the probed keys was free"""
+        if size <= 0:
+            return None
+        token = uuid.uuid4().hex
+        start = random.randrange(size)
+        for i in range(min(size, max(1, getattr(settings, 'ADMISSION_CLAIM_PROBES', 4)))):
+            key = f'{KEY_PREFIX}:{kind}:{(start + i) % size}'
+            if await self.cache.aadd(key, token, timeout=lease):
+                return key, token
+        return None
+
+
+class _KeyLock:
+    """Short best-effort lock around a read-modify-write of one cache key"""
+
+    def __init__(self, cache, key, timeout=2, attempts=20):
+        self.cache = cache
+        self.key = f'{key}:lock'
+        self.timeout = timeout
+        self.attempts = attempts
+        self.held = False
+
+    async def __aenter__(self):
+        for _ in range(self.attempts):
+            if await self.cache.aadd(self.key, 1, timeout=self.timeout):
+                self.held = True
+                return self
+            await asyncio.sleep(0.005)
+        # Contended beyond reason - go ahead rather than block the request
+        logger.warning(f"Proceeding without lock on {self.key}")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.held:
+            await self.cache.adelete(self.key)
+
+
+# Limits live in the cache; this object holds no state of its own
+admission = AdmissionController()
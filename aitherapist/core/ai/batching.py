@@ -0,0 +1,96 @@
+# core/ai/batching.py
+"""
+Dynamic micro-batching for model inference.
+
+Concurrent callers submit single items; a worker thread collects them for up
+to ``max_wait_ms`` (or until ``max_batch_size`` items are waiting), runs one
+batched call and hands every caller its own result through a Future.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class BatchQueueFull(Exception):
+    """Raised when the batcher already holds ``max_queue_size`` pending items"""
+
+
+class MicroBatcher:
+    """Collects concurrent single-item requests into batched calls"""
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5, max_queue_size=256,
+                 name='micro-batcher'):
+        """
+        batch_fn: callable taking a list of items and returning a list of
+        results in the same order.
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms) / 1000.0)
+        self.name = name
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue_size)))
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item):
+        """Queue an item for scoring and return a Future for its result"""
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            raise BatchQueueFull(
+                f"{self.name} queue is full ({self._queue.maxsize} pending items)"
+            )
+        return future
+
+    def pending(self):
+        """Approximate number of items waiting to be batched"""
+        return self._queue.qsize()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            # Keep collecting until the batch is full or the wait window closes
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Batch function returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            logger.error(f"Error running batch of {len(items)} in {self.name}: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,117 @@
+# core/ai/context.py
+"""
+Conversation context for the LLM prompt.
+
+The prompt carries the most recent turns of the conversation that fit in
+CONTEXT_TOKEN_BUDGET, plus a rolling summary (Conversation.summary) of
+everything older. Turns that fall out of the window are folded into the
+summary by a background job, so prompt size stays bounded however long the
+conversation gets.
+"""
+
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+ConversationContext = namedtuple('ConversationContext', ['summary', 'turns'])
+
+# Summaries are refreshed off the request path, a couple at a time
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='conversation-summary')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+async def abuild_context(conversation):
+    """
+    Collect the newest turns of conversation that fit the token budget.
+    Returns ConversationContext(summary, [(user_message, ai_response), ...] oldest first)
+    and schedules a summary refresh when older turns are waiting to be folded in.
+    """
+    from core.models import Chat
+
+    if conversation is None:
+        return ConversationContext('', [])
+
+    budget = getattr(settings, 'CONTEXT_TOKEN_BUDGET', 1500)
+    max_turns = getattr(settings, 'CONTEXT_MAX_TURNS', 20)
+
+    turns = []
+    used = 0
+    oldest_timestamp = None
+    recent = (
+        Chat.objects.filter(conversation=conversation)
+        .order_by('-timestamp', '-id')
+        .only('user_message', 'ai_response', 'timestamp')[:max_turns + 1]
+    )
+    window_full = False
+    async for chat in recent:
+        cost = estimate_tokens(chat.user_message) + estimate_tokens(chat.ai_response)
+        if len(turns) == max_turns or (turns and used + cost > budget):
+            window_full = True
+            break
+        turns.append((chat.user_message, chat.ai_response))
+        used += cost
+        oldest_timestamp = chat.timestamp
+    turns.reverse()
+
+    if window_full:
+        schedule_summary_refresh(conversation.id, oldest_timestamp)
+
+    return ConversationContext(conversation.summary, turns)
+
+
+def schedule_summary_refresh(conversation_id, window_start):
+    """Fold turns older than window_start into the conversation summary, in the background"""
+    with _refreshing_lock:
+        if conversation_id in _refreshing:
+            return
+        _refreshing.add(conversation_id)
+    _summary_executor.submit(_refresh_summary, conversation_id, window_start)
+
+
+def _refresh_summary(conversation_id, window_start):
+    from core.models import Chat, Conversation
+    from .providers import get_provider
+
+    close_old_connections()
+    try:
+        conversation = Conversation.objects.get(pk=conversation_id)
+        pending = Chat.objects.filter(conversation=conversation, timestamp__lt=window_start)
+        if conversation.summarized_until:
+            pending = pending.filter(timestamp__gt=conversation.summarized_until)
+
+        # Wait for a few turns to pile up rather than calling the LLM every message
+        batch = getattr(settings, 'CONTEXT_SUMMARY_BATCH', 4)
+        chats = list(
+            pending.order_by('timestamp', 'id')
+            .only('user_message', 'ai_response', 'timestamp')[:getattr(settings, 'CONTEXT_SUMMARY_MAX_TURNS', 40)]
+        )
+        if len(chats) < batch:
+            return
+
+        summary = get_provider().summarize(
+            conversation.summary,
+            [(chat.user_message, chat.ai_response) for chat in chats],
+            max_words=getattr(settings, 'CONTEXT_SUMMARY_MAX_WORDS', 200),
+        )
+        Conversation.objects.filter(pk=conversation_id).update(
+            summary=summary,
+            summarized_until=chats[-1].timestamp,
+        )
+    except Exception as e:
+        logger.error(f"Error refreshing summary for conversation {conversation_id}: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(conversation_id)
+        close_old_connections()
@@ -3,10 +3,18 @@
 Google Gemini API Client for AI Therapist Response Generation
 """
 
+import asyncio
 import os
 import logging
+import threading
+import time
+from collections import Counter
 from pathlib import Path
 import google.generativeai as genai 
+from django.conf import settings
+
+from .resilience import CircuitBreaker, backoff_delay, is_retryable
+from .router import model_router
 
 logger = logging.getLogger(__name__)
 
@@ -24,49 +32,9 @@ MODEL_FILE = (
     / "gemini_model.txt"
 )
 
-def get_gemini_response(user_message: str) -> str:
-    api_key = None
-
-    if API_KEY_FILE.exists():
-        try:
-            with open(API_KEY_FILE, "r") as f:
-                api_key = f.read().strip()
-        except Exception as e:
-            logger.warning(f"Could not read API key from file: {e}")
-
-    if not api_key:
-        api_key = os.getenv("GEMINI_API_KEY")
-
-    if not api_key:
-        raise ValueError(
-            "GEMINI_API_KEY not found. Add gemini_api_key.txt or set environment variable."
-        )
-
-    try:
-        # Configure Gemini API
-        genai.configure(api_key=api_key)
-
-        # Determine model: file -> env -> default
-        model_name = None
-        if MODEL_FILE.exists():
-            try:
-                with open(MODEL_FILE, "r") as f:
-                    model_name = f.read().strip()
-            except Exception as e:
-                logger.warning(f"Could not read model from file: {e}")
-
-        if not model_name:
-            model_name = os.getenv("GEMINI_MODEL")
-
-        # Set the default to a stable, supported model
-        if not model_name:
-            model_name = "gemini-2.5-flash"
-
-        logger.info(f"Using Gemini model: {model_name}")
-
-        model = genai.GenerativeModel(model_name)
-
-        prompt = f"""
+# Therapist instructions, sent once per model as its system instruction (and
+# registered as cached content where the API allows) instead of with every message
+SYSTEM_INSTRUCTION = """
 You are a supportive AI therapy assistant called AItherapist.
 
 Your role is to help users explore their thoughts and emotions in a calm,
@@ -150,68 +118,626 @@ SAFETY & BOUNDARY RULES:
 
 NB: at the end of each chat remember to finish with a short summary of what you have discussed with the user and solutions that
 you have offered.
+"""
 
-User message: {user_message}
 
-Your response:
+# Smallest prompt each model accepts as explicit cached content, by model
+# name prefix (first match wins); CachedContent.create rejects anything shorter
+PROMPT_CACHE_MIN_TOKENS = (
+    ("gemini-2.5-pro", 4096),
+    ("gemini-2.5-flash", 1024),
+)
+DEFAULT_PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+class GeminiClient:
+    """
+    Long-lived Gemini client, one per process.
+
+    The API key and model name are resolved once and the GenerativeModel is
+    reused, so its underlying transport stays warm between messages. Other
+    models (the router's tiers) are built on first use and kept the same way. The key
+    and model files/env vars are re-checked at most every
+    GEMINI_CONFIG_CHECK_INTERVAL seconds (a stat, not a read) and only reloaded
+    when they change; reload() forces a re-read.
+
+    The therapist instructions are attached to the model as its system
+    instruction. With GEMINI_PROMPT_CACHE on, they are registered once as
+    provider-side cached content (renewed before GEMINI_PROMPT_CACHE_TTL runs
+    out), so each call is billed and processed only for its variable part.
+    That needs the instruction to reach the model's minimum cacheable size
+    (PROMPT_CACHE_MIN_TOKENS, checked once per model with count_tokens);
+    below it, and on models or accounts that can't cache, the plain system
+    instruction is sent and the API's implicit caching is all that applies
+    (cached_tokens in usage_stats() shows how much it saves).
+    """
+
+    def __init__(self, api_key_file=API_KEY_FILE, model_file=MODEL_FILE):
+        self.api_key_file = api_key_file
+        self.model_file = model_file
+        self.api_key = None
+        self.model_name = None
+        self.model = None
+        # Every model in use (the configured one plus router tiers), by name
+        self._models = {}
+        self._caches = {}
+        self._cache_renew_at = {}
+        # SYSTEM_INSTRUCTION's token count per model (None: couldn't count)
+        self._instruction_tokens = {}
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._usage = Counter()
+        self._usage_lock = threading.Lock()
+
+    def reload(self):
+        """Drop cached configuration; the next call re-reads files and environment"""
+        with self._lock:
+            self._signature = None
+            self._next_check = 0.0
+
+    def get_model(self, model_name=None):
+        """
+        Return the shared GenerativeModel for model_name (default: the
+        configured model), reloading configuration if it changed
         """
+        now = time.monotonic()
+        if self.model is None or now >= self._next_check:
+            with self._lock:
+                if self.model is None or now >= self._next_check:
+                    signature = self._config_signature()
+                    if signature != self._signature or self.model is None:
+                        self._load_config()
+                        self._signature = signature
+                    else:
+                        self._renew_caches(now)
+                    self._next_check = now + getattr(settings, 'GEMINI_CONFIG_CHECK_INTERVAL', 5.0)
+
+        if model_name is None or model_name == self.model_name:
+            return self.model
+
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    logger.info(f"Adding Gemini model: {model_name}")
+                    model = self._models[model_name] = self._build_model(model_name)
+        return model
+
+    def _config_signature(self):
+        """Cheap fingerprint of everything the configuration is read from"""
+        def file_stamp(path):
+            try:
+                stat = path.stat()
+                return (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                return None
+
+        return (
+            file_stamp(self.api_key_file),
+            file_stamp(self.model_file),
+            os.getenv("GEMINI_API_KEY"),
+            os.getenv("GEMINI_MODEL"),
+        )
+
+    def _load_config(self):
+        api_key = None
+
+        if self.api_key_file.exists():
+            try:
+                with open(self.api_key_file, "r") as f:
+                    api_key = f.read().strip()
+            except Exception as e:
+                logger.warning(f"Could not read API key from file: {e}")
+
+        if not api_key:
+            api_key = os.getenv("GEMINI_API_KEY")
+
+        if not api_key:
+            raise ValueError(
+                "GEMINI_API_KEY not found. Add gemini_api_key.txt or set environment variable."
+            )
+
+        # Determine model: file -> env -> default
+        model_name = None
+        if self.model_file.exists():
+            try:
+                with open(self.model_file, "r") as f:
+                    model_name = f.read().strip()
+            except Exception as e:
+                logger.warning(f"Could not read model from file: {e}")
+
+        if not model_name:
+            model_name = os.getenv("GEMINI_MODEL")
 
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.7,
-                "max_output_tokens": 2048, 
-            }
+        # Set the default to a stable, supported model
+        if not model_name:
+            model_name = "gemini-2.5-flash"
+
+        if api_key != self.api_key:
+            # Configure Gemini API (rebuilds the transport, so only on key change)
+            genai.configure(api_key=api_key)
+            self.api_key = api_key
+            for name in list(self._caches):
+                self._release_cache(name)
+            self._models.clear()
+            self.model = None
+
+        if self.model is None or model_name != self.model_name:
+            logger.info(f"Using Gemini model: {model_name}")
+            if model_name not in self._models:
+                self._models[model_name] = self._build_model(model_name)
+            self.model = self._models[model_name]
+            self.model_name = model_name
+
+    def _build_model(self, model_name):
+        """GenerativeModel carrying SYSTEM_INSTRUCTION, from cached content when possible"""
+        self._release_cache(model_name)
+
+        if getattr(settings, 'GEMINI_PROMPT_CACHE', True) and self._cacheable(model_name):
+            ttl = int(getattr(settings, 'GEMINI_PROMPT_CACHE_TTL', 3600))
+            try:
+                cached_content = genai.caching.CachedContent.create(
+                    model=model_name,
+                    display_name="aitherapist-system-instruction",
+                    system_instruction=SYSTEM_INSTRUCTION,
+                    ttl=ttl,
+                )
+                self._caches[model_name] = cached_content
+                self._cache_renew_at[model_name] = time.monotonic() + ttl / 2
+                logger.info(f"System instruction cached as {cached_content.name}")
+                return genai.GenerativeModel.from_cached_content(cached_content)
+            except Exception as e:
+                # e.g. the model doesn't support caching or the prompt is under its minimum size
+                logger.warning(f"Prompt caching unavailable for {model_name}, sending the system instruction instead: {e}")
+
+        return genai.GenerativeModel(model_name, system_instruction=SYSTEM_INSTRUCTION)
+
+    def _cacheable(self, model_name):
+        """Whether SYSTEM_INSTRUCTION is big enough for model_name's explicit cache"""
+        if model_name not in self._instruction_tokens:
+            try:
+                self._instruction_tokens[model_name] = genai.GenerativeModel(model_name).count_tokens(
+                    SYSTEM_INSTRUCTION, request_options=_request_options()
+                ).total_tokens
+            except Exception as e:
+                logger.warning(f"Could not count system instruction tokens for {model_name}: {e}")
+                return False
+
+        tokens = self._instruction_tokens[model_name]
+        minimum = next(
+            (size for prefix, size in PROMPT_CACHE_MIN_TOKENS if model_name.startswith(prefix)),
+            DEFAULT_PROMPT_CACHE_MIN_TOKENS,
         )
-        
-        full_response = _extract_full_response(response)
-        return full_response
+        if tokens < minimum:
+            logger.info(
+                f"System instruction is {tokens} tokens, under {model_name}'s {minimum}-token "
+                f"cache minimum; relying on implicit caching"
+            )
+            return False
+        return True
+
+    def _renew_caches(self, now):
+        """Push due cached contents' expiry out again; rebuild models whose cache is gone"""
+        ttl = int(getattr(settings, 'GEMINI_PROMPT_CACHE_TTL', 3600))
+        for model_name, cached_content in list(self._caches.items()):
+            if now < self._cache_renew_at[model_name]:
+                continue
+            try:
+                cached_content.update(ttl=ttl)
+                self._cache_renew_at[model_name] = time.monotonic() + ttl / 2
+            except Exception as e:
+                logger.warning(f"Could not renew cached system instruction for {model_name}: {e}")
+                self._models[model_name] = self._build_model(model_name)
+                if model_name == self.model_name:
+                    self.model = self._models[model_name]
+
+    def _release_cache(self, model_name):
+        cached_content = self._caches.pop(model_name, None)
+        self._cache_renew_at.pop(model_name, None)
+        if cached_content is None:
+            return
+        try:
+            cached_content.delete()
+        except Exception as e:
+            logger.warning(f"Could not delete cached system instruction: {e}")
+
+    def record_usage(self, response, purpose="chat"):
+        """Log and tally the token usage of one generate_content response"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_token_count or 0
+        cached_tokens = usage.cached_content_token_count or 0
+        output_tokens = usage.candidates_token_count or 0
+
+        logger.debug(
+            f"Gemini {purpose} call: {prompt_tokens} prompt tokens "
+            f"({cached_tokens} from cache), {output_tokens} output tokens"
+        )
+        with self._usage_lock:
+            self._usage['calls'] += 1
+            self._usage['prompt_tokens'] += prompt_tokens
+            self._usage['cached_tokens'] += cached_tokens
+            self._usage['output_tokens'] += output_tokens
 
-    except Exception as e:
-        err_text = str(e)
-        logger.error(f"Gemini API error: {err_text}")
+    def usage_stats(self):
+        with self._usage_lock:
+            stats = dict(self._usage)
+        prompt_tokens = stats.get('prompt_tokens', 0)
+        stats['cached_ratio'] = stats.get('cached_tokens', 0) / prompt_tokens if prompt_tokens else 0.0
+        stats['prompt_caches'] = {name: cache.name for name, cache in self._caches.items()}
+        return stats
+
+
+# One per process, so the transport and the model objects stay warm
+gemini_client = GeminiClient()
+
+
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "max_output_tokens": 2048,
+}
+
+
+# Consecutive upstream failures open the circuit; calls then fail fast
+# (and the views fall back to templates) until a probe succeeds
+gemini_breaker = CircuitBreaker(
+    'Gemini',
+    failure_threshold=getattr(settings, 'GEMINI_BREAKER_THRESHOLD', 5),
+    reset_timeout=getattr(settings, 'GEMINI_BREAKER_RESET_TIMEOUT', 30.0),
+)
 
-        suggestion = ""
+
+# A cancellation this close to the caller's deadline was the deadline
+_DEADLINE_SLACK = 0.01
+
+
+def _request_options(timeout=None):
+    """Per-attempt deadline for the SDK; its own retries are off, ours apply"""
+    if timeout is None:
+        timeout = getattr(settings, 'GEMINI_READ_TIMEOUT', 12.0)
+    return {"timeout": timeout, "retry": None}
+
+
+def _retry_settings():
+    return (
+        max(0, int(getattr(settings, 'GEMINI_MAX_RETRIES', 2))),
+        getattr(settings, 'GEMINI_BACKOFF_BASE', 0.5),
+        getattr(settings, 'GEMINI_BACKOFF_MAX', 4.0),
+    )
+
+
+def _after_failure(e, attempt, max_retries, base, maximum, time_left=None):
+    """
+    Record a failed attempt; return the backoff delay, or None to give up
+    (also when time_left, if given, would run out during the backoff)
+    """
+    if not is_retryable(e):
+        # The API answered (bad request, blocked prompt, ...) - upstream is healthy
+        gemini_breaker.record_success()
+        return None
+    gemini_breaker.record_failure()
+    if attempt >= max_retries:
+        return None
+    delay = backoff_delay(attempt, base, maximum)
+    if time_left is not None and delay >= time_left:
+        return None
+    logger.warning(f"Gemini call failed ({type(e).__name__}: {e}), retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+    return delay
+
+
+def _call_with_retries(call):
+    """Run call() under the circuit breaker, retrying retryable errors with jittered backoff"""
+    max_retries, base, maximum = _retry_settings()
+    attempt = 0
+    while True:
+        gemini_breaker.before_call()
         try:
-            if hasattr(genai, "list_models"):
-                models = genai.list_models()
-                ids = []
-                for m in models:
-                    name = getattr(m, "name", str(m))
-                    if "generateContent" in getattr(m, "supported_generation_methods", []):
-                        ids.append(name.replace("models/", ""))
-                
-                #set of stable models for the suggestion list
-                stable_ids = [
-                    "gemini-2.5-flash", 
-                    "gemini-2.5-pro", 
-                    "gemini-flash-latest", 
-                    "gemini-pro-latest"
-                ]
-                
-                # Show only the stable IDs for simplicity
-                suggestion_list = [id for id in stable_ids if id in ids] or ids[:4]
-                
-                if suggestion_list:
-                    suggestion = (
-                        "Available stable models: " + ", ".join(suggestion_list) + ". "
-                        "Set the environment variable `GEMINI_MODEL` or create a `gemini_model.txt` "
-                        "file with a supported model name."
-                    )
-        except Exception:
-            # If listing models failed, include a generic hint
-            suggestion = (
-                "If you see a 'model not found' error, ensure you are using a supported "
-                "model name (e.g., 'gemini-2.5-flash')."
-            )
+            result = call()
+        except Exception as e:
+            delay = _after_failure(e, attempt, max_retries, base, maximum)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        gemini_breaker.record_success()
+        return result
+
+
+async def _acall_with_retries(make_call, first_byte_timeout=None, deadline=None):
+    """
+    Async twin of _call_with_retries. make_call(timeout) returns a fresh
+    awaitable per attempt, passing timeout on as the SDK read timeout.
+
+    With a deadline (event-loop time, e.g. the view's latency budget) every
+    attempt is held to the time left, so a slow upstream times out here -
+    counted by the breaker and retried if there is time - rather than being
+    cancelled by the caller. A cancellation at the deadline still counts as
+    a failure.
+    """
+    loop = asyncio.get_running_loop()
+    max_retries, base, maximum = _retry_settings()
+    read_timeout = getattr(settings, 'GEMINI_READ_TIMEOUT', 12.0)
+    attempt = 0
+    while True:
+        time_left = None if deadline is None else deadline - loop.time()
+        if time_left is not None and time_left <= 0:
+            raise asyncio.TimeoutError("Latency budget spent before the Gemini call")
+        timeout = read_timeout if time_left is None else min(read_timeout, time_left)
+        wait = timeout if first_byte_timeout is None else min(first_byte_timeout, timeout)
+
+        gemini_breaker.before_call()
+        try:
+            result = await asyncio.wait_for(make_call(timeout), wait)
+        except asyncio.CancelledError:
+            if deadline is not None and loop.time() >= deadline - _DEADLINE_SLACK:
+                # Cut off by the caller's budget: the upstream was too slow
+                gemini_breaker.record_failure()
+            raise
+        except Exception as e:
+            time_left = None if deadline is None else deadline - loop.time()
+            delay = _after_failure(e, attempt, max_retries, base, maximum, time_left)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        gemini_breaker.record_success()
+        return result
+
+
+def _format_context(context) -> str:
+    """Render the conversation summary and recent turns for the prompt"""
+    if context is None:
+        return ""
+
+    parts = []
+    if context.summary:
+        parts.append(f"Summary of the earlier conversation:\n{context.summary}\n")
+    if context.turns:
+        lines = []
+        for user_text, ai_text in context.turns:
+            lines.append(f"User: {user_text}")
+            lines.append(f"AItherapist: {ai_text}")
+        parts.append("Recent conversation:\n" + "\n\n".join(lines) + "\n")
+    return "\n".join(parts)
+
+
+def _build_prompt(user_message: str, context=None) -> str:
+    """The per-request part of the prompt; the instructions travel as SYSTEM_INSTRUCTION"""
+    return f"""{_format_context(context)}
+User message: {user_message}
+
+Your response:
+"""
+
+
+def _route(user_message: str, context=None):
+    """
+    (model, generation_config, RouteDecision) for one message. Blocking (see
+    GeminiClient.get_model): async callers run it in a thread.
+    """
+    gemini_client.get_model()
+    route = model_router.route(user_message, context, default_model=gemini_client.model_name)
+    generation_config = dict(GENERATION_CONFIG, max_output_tokens=route.max_output_tokens)
+    return gemini_client.get_model(route.model), generation_config, route
+
+
+def _record_failed_latency(route, started, e, deadline=None):
+    """
+    Timeouts and overload are latency the router should see; fast failures
+    aren't. A call cut off at the caller's deadline counts as the whole
+    LLM_LATENCY_BUDGET - it would have taken at least that long.
+    """
+    elapsed = time.monotonic() - started
+    if deadline is not None and asyncio.get_running_loop().time() >= deadline - _DEADLINE_SLACK:
+        model_router.record_latency(route.model, max(elapsed, getattr(settings, 'LLM_LATENCY_BUDGET', 20.0)))
+    elif is_retryable(e):
+        model_router.record_latency(route.model, elapsed)
+
+
+async def aget_gemini_response(user_message: str, context=None, deadline=None) -> str:
+    """
+    Generate the full response. Failures raise, so the caller can fall back
+    to another engine. deadline (event-loop time) bounds every attempt and
+    retry.
+    """
+    # Resolving the model can re-read the config files and create or renew the
+    # prompt cache over the network; keep that off the event loop
+    model, generation_config, route = await asyncio.to_thread(_route, user_message, context)
+    started = time.monotonic()
+
+    try:
+        response = await _acall_with_retries(lambda timeout: model.generate_content_async(
+            _build_prompt(user_message, context),
+            generation_config=generation_config,
+            request_options=_request_options(timeout)
+        ), deadline=deadline)
+        gemini_client.record_usage(response)
+        model_router.record_latency(route.model, time.monotonic() - started)
+        return _extract_full_response(response)
+
+    except asyncio.CancelledError as e:
+        _record_failed_latency(route, started, e, deadline)
+        raise
 
-        user_message = (
-            "I'm here with you. I'm having a technical issue responding fully right now, "
-            "but you're not alone. You can share more if you'd like.\n\n"
-            "Technical note: " + err_text + "\n" + suggestion
+    except Exception as e:
+        _record_failed_latency(route, started, e, deadline)
+        await _alog_model_not_found(e)
+        raise
+
+
+async def astream_gemini_response(user_message: str, context=None, deadline=None):
+    """
+    Yield the response text chunk by chunk as Gemini generates it.
+    Errors before the first chunk raise, as for aget_gemini_response;
+    errors mid-stream end the stream early. deadline bounds the attempts
+    as for aget_gemini_response.
+    """
+    # Resolving the model can re-read the config files and create or renew the
+    # prompt cache over the network; keep that off the event loop
+    model, generation_config, route = await asyncio.to_thread(_route, user_message, context)
+    started = time.monotonic()
+    streamed = False
+
+    try:
+        # Connect timeout bounds the wait for the first chunk
+        response = await _acall_with_retries(
+            lambda timeout: model.generate_content_async(
+                _build_prompt(user_message, context),
+                generation_config=generation_config,
+                stream=True,
+                request_options=_request_options(timeout)
+            ),
+            first_byte_timeout=getattr(settings, 'GEMINI_CONNECT_TIMEOUT', 5.0),
+            deadline=deadline,
         )
 
-        return user_message
+        async for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                streamed = True
+                yield text
+        gemini_client.record_usage(response)
+        model_router.record_latency(route.model, time.monotonic() - started)
+
+        if not streamed:
+            # Nothing came through - surface the block / finish reason
+            yield _extract_full_response(response)
+
+    except asyncio.CancelledError as e:
+        # Before or during the stream: the caller's budget ran out (or it went away)
+        _record_failed_latency(route, started, e, deadline)
+        raise
+
+    except Exception as e:
+        if streamed:
+            logger.error(f"Gemini stream interrupted: {e}")
+            return
+        _record_failed_latency(route, started, e, deadline)
+        await _alog_model_not_found(e)
+        raise
+
+
+def summarize_conversation(previous_summary: str, turns, max_words: int = 200) -> str:
+    """
+    Fold turns [(user_message, ai_response), ...] into the running summary.
+    Used by the background summary refresh; raises on failure.
+    """
+    gemini_client.get_model()
+    # Plain model - the therapist system instruction doesn't apply here
+    model = genai.GenerativeModel(gemini_client.model_name)
+    transcript = "\n\n".join(
+        f"User: {user_text}\nAItherapist: {ai_text}" for user_text, ai_text in turns
+    )
+    prompt = f"""
+You maintain a private running summary of a supportive conversation between a
+user and AItherapist, used to give AItherapist memory of earlier turns.
+
+Update the existing summary with the new turns below. Keep what matters for
+continuity: the feelings and situations the user described, their intensity
+and patterns, and the coping suggestions already offered. Write in the third
+person, in plain prose, in at most {max_words} words.
+
+Existing summary:
+{previous_summary or "(none yet)"}
+
+New turns:
+{transcript}
+
+Updated summary:
+"""
+    response = _call_with_retries(lambda: model.generate_content(
+        prompt,
+        generation_config={
+            "temperature": 0.2,
+            "max_output_tokens": max_words * 2,
+        },
+        request_options=_request_options()
+    ))
+    gemini_client.record_usage(response, purpose="summary")
+    return _extract_full_response(response)
+
+
+def _chunk_text(chunk) -> str:
+    # chunk.text raises if the chunk carries no text parts (e.g. final safety chunk)
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+class ModelCatalogue:
+    """
+    Ids of the models that support generateContent, fetched from the API at
+    most once per GEMINI_MODEL_CATALOGUE_TTL seconds (failed fetches too), so
+    error diagnostics never add a list_models() round trip per request.
+    """
+
+    # Stable models preferred in the suggestion list
+    STABLE_IDS = [
+        "gemini-2.5-flash",
+        "gemini-2.5-pro",
+        "gemini-flash-latest",
+        "gemini-pro-latest"
+    ]
+
+    def __init__(self):
+        self._ids = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def model_ids(self):
+        """Cached model ids (None if they have never been fetched successfully)"""
+        if time.monotonic() < self._expires:
+            return self._ids
+
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._expires:
+                self._expires = now + getattr(settings, 'GEMINI_MODEL_CATALOGUE_TTL', 3600)
+                try:
+                    models = genai.list_models(request_options=_request_options())
+                    self._ids = [
+                        getattr(m, "name", str(m)).replace("models/", "")
+                        for m in models
+                        if "generateContent" in getattr(m, "supported_generation_methods", [])
+                    ]
+                except Exception as e:
+                    logger.warning(f"Could not fetch the Gemini model catalogue: {e}")
+            return self._ids
+
+    def suggestions(self):
+        ids = self.model_ids() or []
+        # Show only the stable IDs for simplicity
+        return [id for id in self.STABLE_IDS if id in ids] or ids[:4]
+
+
+model_catalogue = ModelCatalogue()
+
+
+async def _alog_model_not_found(e):
+    """
+    On a 'model not found' error, log the models this key can use instead.
+    The catalogue may be fetched over the network, so that runs in a thread.
+    """
+    if getattr(e, "code", None) != 404 and "not found" not in str(e).lower():
+        return
+    suggestions = await asyncio.to_thread(model_catalogue.suggestions)
+    if suggestions:
+        logger.error(
+            f"Gemini model not found ({e}). Available stable models: {', '.join(suggestions)}. "
+            "Set the environment variable `GEMINI_MODEL` or create a `gemini_model.txt` "
+            "file with a supported model name."
+        )
+    else:
+        logger.error(
+            f"Gemini model not found ({e}), and the model list could not be fetched. "
+            "Ensure you are using a supported model name (e.g., 'gemini-2.5-flash')."
+        )
 
 
 def _extract_full_response(response) -> str:
@@ -0,0 +1,213 @@
+# core/ai/inference_server.py
+"""
+Shared sentiment inference service.
+
+One process (``manage.py run_sentiment_server``) holds the model and serves
+scoring requests over a UNIX socket or localhost TCP; web workers talk to it
+through InferenceClient instead of each loading their own copy of torch.
+Requests from all connections go through one MicroBatcher, so the server also
+batches across workers.
+
+Protocol: one JSON object per line.
+    request:  {"texts": ["...", ...]}
+    response: {"results": [["positive", 0.98], ...]}  or  {"error": "..."}
+
+The protocol has no authentication, so TCP servers only bind to loopback
+addresses unless explicitly allowed to listen elsewhere.
+"""
+
+import ipaddress
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+from .batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = 'tcp://127.0.0.1:8765'
+
+# A kept-alive connection the server has since closed; worth one reconnect
+_STALE_CONNECTION_ERRORS = (ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+
+class InferenceServerUnavailable(Exception):
+    """Raised by InferenceClient when the server cannot be reached or fails"""
+
+
+class InferenceServerTimeout(InferenceServerUnavailable):
+    """The server accepted the request but didn't answer in time"""
+
+
+def parse_address(address):
+    """
+    'unix:/path/to.sock' or 'unix:///path/to.sock' -> ('unix', '/path/to.sock')
+    'tcp://127.0.0.1:8765' or '127.0.0.1:8765'   -> ('tcp', ('127.0.0.1', 8765))
+    ':8765'                                       -> ('tcp', ('127.0.0.1', 8765))
+    """
+    if address.startswith('unix:'):
+        path = address[len('unix:'):]
+        if path.startswith('//'):
+            path = path[2:]
+        return 'unix', path
+
+    if address.startswith('tcp://'):
+        address = address[len('tcp://'):]
+    host, _, port = address.rpartition(':')
+    if not port.isdigit():
+        raise ValueError(f"Invalid inference server address: {address!r}")
+    return 'tcp', (host or '127.0.0.1', int(port))
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # One connection carries many requests; clients keep it open
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                texts = json.loads(line)['texts']
+                futures = [self.server.batcher.submit(text) for text in texts]
+                results = [future.result(timeout=self.server.request_timeout) for future in futures]
+                reply = {'results': [list(result) for result in results]}
+            except Exception as e:
+                logger.error(f"Inference server request failed: {e}")
+                reply = {'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def build_server(address, backend, max_batch_size=32, max_wait_ms=5, max_queue_size=1024,
+                 request_timeout=10.0, allow_remote=False):
+    """
+    Create (but do not start) a server scoring with an already loaded backend.
+    TCP addresses must be loopback unless allow_remote is set.
+    """
+    kind, target = parse_address(address)
+    if kind == 'unix':
+        if os.path.exists(target):
+            os.unlink(target)
+        server = _ThreadingUnixServer(target, _RequestHandler)
+    else:
+        if not allow_remote and not is_loopback(target[0]):
+            raise ValueError(
+                f"Refusing to listen on {target[0]}: the inference server has no authentication. "
+                "Use a loopback or unix: address, or allow remote connections explicitly."
+            )
+        server = _ThreadingTCPServer(target, _RequestHandler)
+
+    server.batcher = MicroBatcher(
+        backend.predict,
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+        max_queue_size=max_queue_size,
+        name='inference-server-batcher',
+    )
+    server.request_timeout = request_timeout
+    return server
+
+
+class InferenceClient:
+    """
+    Client for the inference server. Each thread keeps its own connection
+    open between calls and reconnects once if it has gone stale. A request
+    that times out is never re-sent: the server is slow, not gone, and a
+    second attempt would only double the caller's wait.
+    """
+
+    def __init__(self, address, connect_timeout=0.5, timeout=5.0):
+        self.address = address
+        self.kind, self.target = parse_address(address)
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def score(self, texts):
+        """Score texts on the server -> [(sentiment, confidence), ...]"""
+        payload = json.dumps({'texts': list(texts)}).encode('utf-8') + b'\n'
+
+        for attempt in range(2):
+            reused = getattr(self._local, 'stream', None) is not None
+            try:
+                stream = self._connection()
+            except OSError as e:
+                raise InferenceServerUnavailable(f"{self.address}: {e}") from e
+
+            try:
+                stream.write(payload)
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionResetError("Inference server closed the connection")
+                break
+            except socket.timeout as e:
+                self.close()
+                raise InferenceServerTimeout(f"{self.address}: no reply within {self.timeout}s") from e
+            except _STALE_CONNECTION_ERRORS as e:
+                self.close()
+                # Only a connection left over from an earlier call can be stale
+                if attempt or not reused:
+                    raise InferenceServerUnavailable(f"{self.address}: {e}") from e
+            except OSError as e:
+                self.close()
+                raise InferenceServerUnavailable(f"{self.address}: {e}") from e
+
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise InferenceServerUnavailable(f"{self.address}: {reply['error']}")
+        return [(sentiment, float(confidence)) for sentiment, confidence in reply['results']]
+
+    def close(self):
+        stream = getattr(self._local, 'stream', None)
+        sock = getattr(self._local, 'sock', None)
+        self._local.stream = None
+        self._local.sock = None
+        for resource in (stream, sock):
+            if resource is not None:
+                try:
+                    resource.close()
+                except OSError:
+                    pass
+
+    def _connection(self):
+        stream = getattr(self._local, 'stream', None)
+        if stream is not None:
+            return stream
+
+        if self.kind == 'unix':
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(self.target)
+            except OSError:
+                sock.close()
+                raise
+        else:
+            sock = socket.create_connection(self.target, timeout=self.connect_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+
+        self._local.sock = sock
+        self._local.stream = sock.makefile('rwb')
+        return self._local.stream
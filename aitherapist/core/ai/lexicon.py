@@ -0,0 +1,118 @@
+# core/ai/lexicon.py
+"""
+Fast lexicon/rule sentiment scorer - the first tier of the sentiment cascade.
+
+Scores a message in a single regex pass with dictionary lookups (no model),
+handling negation and intensifiers. Messages it is not confident about are
+escalated to the transformer backend by AITherapist.
+"""
+
+import math
+import re
+
+# Keyword vocabularies shared with AITherapist._personalize_response
+TOPIC_KEYWORDS = {
+    'stress': ['stress', 'stressed', 'overwhelmed', 'pressure'],
+    'anxiety': ['anxious', 'anxiety', 'worried', 'nervous'],
+    'sadness': ['sad', 'depressed', 'down', 'lonely'],
+    'work': ['work', 'job', 'career', 'boss'],
+    'relationship': ['relationship', 'friend', 'family', 'partner'],
+}
+
+# Word -> polarity weight. Negative vocabulary builds on the stress / anxiety /
+# sadness keywords above (the coping-strategy categories); positive vocabulary
+# on the language of the positive response templates.
+WORD_WEIGHTS = {
+    # stress
+    'stress': -1.5, 'stressed': -2.0, 'stressful': -2.0, 'overwhelmed': -2.5,
+    'overwhelming': -2.0, 'pressure': -1.0, 'exhausted': -2.0, 'burnt': -1.5,
+    'burned': -1.0, 'tired': -1.0,
+    # anxiety
+    'anxious': -2.0, 'anxiety': -2.0, 'worried': -2.0, 'worry': -1.5,
+    'nervous': -1.5, 'scared': -2.0, 'afraid': -2.0, 'panic': -2.5,
+    'panicking': -2.5, 'terrified': -3.0, 'fear': -1.5,
+    # sadness
+    'sad': -2.0, 'depressed': -3.0, 'depressing': -2.5, 'lonely': -2.5,
+    'alone': -1.0, 'unhappy': -2.5, 'miserable': -3.0, 'hopeless': -3.0,
+    'worthless': -3.0, 'crying': -2.0, 'cry': -1.5, 'hurt': -2.0,
+    'heartbroken': -3.0, 'grief': -2.5, 'empty': -1.5, 'numb': -1.5,
+    # general negative
+    'angry': -2.0, 'upset': -2.0, 'frustrated': -2.0, 'awful': -2.5,
+    'terrible': -2.5, 'horrible': -2.5, 'bad': -1.5, 'worse': -2.0,
+    'worst': -2.5, 'hate': -2.5, 'struggling': -2.0, 'failing': -2.0,
+    'failed': -2.0, 'ashamed': -2.5, 'guilty': -2.0, 'humiliated': -3.0,
+    # positive
+    'happy': 2.0, 'glad': 2.0, 'great': 2.0, 'good': 1.5, 'wonderful': 2.5,
+    'amazing': 2.5, 'awesome': 2.5, 'fantastic': 2.5, 'excited': 2.0,
+    'joy': 2.5, 'joyful': 2.5, 'love': 2.0, 'loved': 2.0, 'grateful': 2.5,
+    'thankful': 2.5, 'proud': 2.5, 'calm': 1.5, 'relaxed': 2.0,
+    'peaceful': 2.0, 'hopeful': 2.0, 'better': 1.5, 'best': 2.0,
+    'encouraging': 2.0, 'positive': 1.5, 'confident': 2.0, 'optimistic': 2.0,
+    'relieved': 2.0, 'celebrate': 2.0, 'enjoyed': 2.0, 'fun': 1.5,
+}
+
+NEGATORS = frozenset([
+    'not', 'no', 'never', 'nothing', 'nobody', 'hardly', 'barely', 'without',
+    "don't", "dont", "doesn't", "didn't", "isn't", "wasn't", "aren't", "can't",
+    "cant", "won't", "couldn't", "shouldn't", "haven't", "hasn't",
+])
+
+INTENSIFIERS = {
+    'very': 1.5, 'so': 1.4, 'really': 1.4, 'extremely': 1.8, 'incredibly': 1.8,
+    'super': 1.5, 'totally': 1.5, 'completely': 1.6, 'too': 1.3,
+}
+
+# Words that signal mixed or shifting sentiment the lexicon can't resolve
+CONTRAST_WORDS = frozenset(['but', 'however', 'although', 'though', 'yet'])
+
+# Negation applies to the next few tokens ("not feeling very good")
+NEGATION_SCOPE = 3
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+class LexiconScorer:
+    """Rule-based scorer returning (sentiment, confidence) like the model backends"""
+
+    def __init__(self, weights=None):
+        self.weights = weights or WORD_WEIGHTS
+
+    def score(self, text):
+        tokens = _TOKEN_RE.findall(text.lower())
+
+        positive = negative = 0.0
+        negate_left = 0
+        boost = 1.0
+        for token in tokens:
+            if token in CONTRAST_WORDS:
+                return 'neutral', 0.0
+            if token in NEGATORS:
+                negate_left = NEGATION_SCOPE
+                continue
+            if token in INTENSIFIERS:
+                boost = INTENSIFIERS[token]
+                continue
+
+            weight = self.weights.get(token)
+            if weight is not None:
+                weight *= boost
+                if negate_left:
+                    # "not happy" is negative, but "not sad" is only weakly positive
+                    weight = -weight * (0.5 if weight < 0 else 1.0)
+                if weight > 0:
+                    positive += weight
+                else:
+                    negative -= weight
+            boost = 1.0
+            if negate_left:
+                negate_left -= 1
+
+        total = positive + negative
+        if total == 0:
+            return 'neutral', 0.0
+
+        # Confidence grows with the amount of evidence and shrinks with mixed signals
+        polarity = (positive - negative) / total
+        confidence = 0.5 + 0.5 * abs(polarity) * math.tanh(total / 2.5)
+        sentiment = 'positive' if polarity > 0 else 'negative' if polarity < 0 else 'neutral'
+        return sentiment, confidence
@@ -0,0 +1,228 @@
+# core/ai/providers.py
+"""
+LLM providers behind the chat views.
+
+The views talk to whatever LLM_PROVIDER names:
+
+- 'gemini'  Google Gemini through core.ai.gemini_client (default)
+- 'local'   offline, deterministic stand-in for tests, load tests and
+            benchmarks - no network or API key needed
+
+Every provider exposes the same calls: aget_response / astream_response for
+the chat views, summarize() for the conversation memory, and stats().
+Generation failures raise (streams: only before the first chunk), so the
+caller can fall back to the local template engine. The chat calls take the
+caller's deadline (event-loop time) so a provider can fit its timeouts and
+retries inside it.
+"""
+
+import asyncio
+import random
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+
+class LLMProviderError(Exception):
+    """A provider could not generate a response"""
+
+
+class LLMProvider:
+    """Base class - one instance per process, shared by all requests"""
+
+    name = None
+
+    async def aget_response(self, user_message, context=None, deadline=None):
+        raise NotImplementedError
+
+    async def astream_response(self, user_message, context=None, deadline=None):
+        raise NotImplementedError
+        yield  # pragma: no cover - marks this as an async generator
+
+    def summarize(self, previous_summary, turns, max_words=200):
+        """Fold turns [(user_message, ai_response), ...] into the summary; raises on failure"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini, through the shared per-process GeminiClient"""
+
+    name = 'gemini'
+
+    async def aget_response(self, user_message, context=None, deadline=None):
+        from .gemini_client import aget_gemini_response
+        return await aget_gemini_response(user_message, context, deadline=deadline)
+
+    async def astream_response(self, user_message, context=None, deadline=None):
+        from .gemini_client import astream_gemini_response
+        async for text in astream_gemini_response(user_message, context, deadline=deadline):
+            yield text
+
+    def summarize(self, previous_summary, turns, max_words=200):
+        from .gemini_client import summarize_conversation
+        return summarize_conversation(previous_summary, turns, max_words=max_words)
+
+    def stats(self):
+        from .gemini_client import gemini_breaker, gemini_client
+        from .router import model_router
+        stats = gemini_client.usage_stats()
+        stats['circuit'] = gemini_breaker.stats()
+        stats['routing'] = model_router.stats()
+        return stats
+
+
+class LocalProvider(LLMProvider):
+    """
+    Deterministic offline stand-in for Gemini.
+
+    Response text comes from AITherapist's response templates, picked with an
+    RNG seeded by (seed, message, turn count) - the same message in the same
+    place always gets the same answer. Latency and failures are drawn from a
+    separate RNG seeded once with seed, so a run's sequence of delays and
+    errors is reproducible too.
+
+    latency_ms is the time to the first chunk, drawn from distribution:
+    'fixed', 'uniform' (latency_ms +/- jitter_ms), 'normal' (standard
+    deviation jitter_ms), 'lognormal' (median latency_ms, spread jitter_ms) or
+    'exponential' (mean latency_ms). Streaming then yields chunk_chars
+    characters every chunk_interval_ms; non-streaming calls take the same total
+    time. error_rate is the fraction of calls that fail with LLMProviderError.
+    """
+
+    name = 'local'
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+    def __init__(self, latency_ms=800, distribution='fixed', jitter_ms=0, error_rate=0.0,
+                 chunk_chars=40, chunk_interval_ms=30, seed=0):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution '{distribution}'. "
+                f"Choose one of: {', '.join(self.DISTRIBUTIONS)}"
+            )
+        self.latency_ms = max(0.0, float(latency_ms))
+        self.distribution = distribution
+        self.jitter_ms = max(0.0, float(jitter_ms))
+        self.error_rate = min(1.0, max(0.0, float(error_rate)))
+        self.chunk_chars = max(1, int(chunk_chars))
+        self.chunk_interval_ms = max(0.0, float(chunk_interval_ms))
+        self.seed = seed
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stats = Counter()
+
+    async def aget_response(self, user_message, context=None, deadline=None):
+        latency, failed = self._draw()
+        chunks = self._chunks(user_message, context)
+        await asyncio.sleep(self._total_seconds(latency, chunks))
+        self._raise_if(failed)
+        return "".join(chunks)
+
+    async def astream_response(self, user_message, context=None, deadline=None):
+        latency, failed = self._draw()
+        await asyncio.sleep(latency)
+        self._raise_if(failed)
+        for i, chunk in enumerate(self._chunks(user_message, context)):
+            if i:
+                await asyncio.sleep(self.chunk_interval_ms / 1000)
+            yield chunk
+
+    def summarize(self, previous_summary, turns, max_words=200):
+        notes = [previous_summary] if previous_summary else []
+        notes.extend(f"The user said: {user_text}" for user_text, _ai_text in turns)
+        words = " ".join(notes).split()
+        return " ".join(words[-max_words:])
+
+    def stats(self):
+        with self._rng_lock:
+            return dict(self._stats)
+
+    def _draw(self):
+        """Sample (latency in seconds, whether this call fails) for one call"""
+        with self._rng_lock:
+            latency = self._sample_latency_ms()
+            failed = self._rng.random() < self.error_rate
+            self._stats['calls'] += 1
+            if failed:
+                self._stats['errors'] += 1
+        return max(0.0, latency) / 1000, failed
+
+    def _sample_latency_ms(self):
+        rng = self._rng
+        if self.distribution == 'uniform':
+            return rng.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        if self.distribution == 'normal':
+            return rng.gauss(self.latency_ms, self.jitter_ms)
+        if self.distribution == 'lognormal' and self.latency_ms > 0:
+            sigma = self.jitter_ms / self.latency_ms
+            return self.latency_ms * rng.lognormvariate(0.0, sigma)
+        if self.distribution == 'exponential' and self.latency_ms > 0:
+            return rng.expovariate(1.0 / self.latency_ms)
+        return self.latency_ms
+
+    @staticmethod
+    def _raise_if(failed):
+        if failed:
+            raise LLMProviderError("Local LLM provider: simulated generation failure")
+
+    def _chunks(self, user_message, context):
+        text = self._response_text(user_message, context)
+        size = self.chunk_chars
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    def _total_seconds(self, latency, chunks):
+        return latency + (len(chunks) - 1) * self.chunk_interval_ms / 1000
+
+    def _response_text(self, user_message, context):
+        from core.ai_therapist import ai_therapist
+        from .lexicon import LexiconScorer
+
+        turn_count = len(context.turns) if context is not None else 0
+        rng = random.Random(f"{self.seed}:{turn_count}:{user_message}")
+        sentiment, confidence = LexiconScorer().score(user_message)
+        return ai_therapist.generate_response(user_message, sentiment, confidence, rng=rng)
+
+
+PROVIDERS = {
+    GeminiProvider.name: GeminiProvider,
+    LocalProvider.name: LocalProvider,
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """The shared provider named by name or LLM_PROVIDER (built once per process)"""
+    name = name or getattr(settings, 'LLM_PROVIDER', GeminiProvider.name)
+    provider = _providers.get(name)
+    if provider is not None:
+        return provider
+
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = _build_provider(name)
+        return _providers[name]
+
+
+def _build_provider(name):
+    if name not in PROVIDERS:
+        raise ValueError(
+            f"Unknown LLM provider '{name}'. Choose one of: {', '.join(PROVIDERS)}"
+        )
+    if name == LocalProvider.name:
+        return LocalProvider(
+            latency_ms=getattr(settings, 'LOCAL_LLM_LATENCY_MS', 800),
+            distribution=getattr(settings, 'LOCAL_LLM_LATENCY_DISTRIBUTION', 'fixed'),
+            jitter_ms=getattr(settings, 'LOCAL_LLM_LATENCY_JITTER_MS', 0),
+            error_rate=getattr(settings, 'LOCAL_LLM_ERROR_RATE', 0.0),
+            chunk_chars=getattr(settings, 'LOCAL_LLM_CHUNK_CHARS', 40),
+            chunk_interval_ms=getattr(settings, 'LOCAL_LLM_CHUNK_INTERVAL_MS', 30),
+            seed=getattr(settings, 'LOCAL_LLM_SEED', 0),
+        )
+    return PROVIDERS[name]()
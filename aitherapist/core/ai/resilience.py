@@ -0,0 +1,100 @@
+# core/ai/resilience.py
+"""
+Failure handling for calls to upstream APIs: which errors are worth
+retrying, jittered exponential backoff between attempts, and a circuit
+breaker that fails fast while the upstream is down.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth another attempt (rate limited or server side)
+RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open"""
+
+
+def is_retryable(error):
+    """Timeouts and rate-limit / server errors (google.api_core errors carry .code)"""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    return getattr(error, 'code', None) in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt, base=0.5, maximum=4.0):
+    """Full-jitter exponential backoff: uniform in [0, min(maximum, base * 2**attempt)]"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed     calls go through; failure_threshold failures in a row open it
+    open       calls fail fast with CircuitOpenError for reset_timeout seconds
+    half-open  one probe call is let through; success closes the circuit,
+               failure opens it again (a probe that never reports back,
+               e.g. cancelled, is replaced after reset_timeout)
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and (
+                not self._probing or now - self._probe_started >= self.reset_timeout
+            ):
+                # Let this call through as the recovery probe
+                self._probing = True
+                self._probe_started = now
+                return
+        raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"{self.name} circuit closed")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"{self.name} circuit opened after {self._failures} consecutive failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self._failures}
@@ -0,0 +1,165 @@
+# core/ai/router.py
+"""
+Per-message model routing across Gemini tiers.
+
+Each message is sent to one of three tiers, each with its own model and
+output budget:
+
+- 'fast'      short check-ins early in a conversation (GEMINI_FAST_MODEL)
+- 'standard'  everything else (the configured model - gemini_model.txt /
+              GEMINI_MODEL)
+- 'strong'    long disclosures and high-intensity distress
+              (GEMINI_STRONG_MODEL)
+
+The decision looks at message length, lexicon sentiment and intensity,
+conversation depth, and each model's rolling p95 latency: a tier whose model
+is running slower than GEMINI_ROUTER_P95_LIMIT is stepped down to the next
+faster tier. A stepped-down model gets no traffic and so no new samples;
+samples older than GEMINI_ROUTER_LATENCY_MAX_AGE seconds drop out of the
+window, so it is tried again once its slow spell has aged out. Decisions are
+logged and counted; stats() exposes them with the latency percentiles.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+from django.conf import settings
+
+from .context import estimate_tokens
+from .lexicon import LexiconScorer
+
+logger = logging.getLogger(__name__)
+
+ModelTier = namedtuple('ModelTier', ['name', 'model', 'max_output_tokens'])
+RouteDecision = namedtuple('RouteDecision', ['tier', 'model', 'max_output_tokens', 'reason'])
+
+TIER_FAST = 'fast'
+TIER_STANDARD = 'standard'
+TIER_STRONG = 'strong'
+TIER_ORDER = (TIER_FAST, TIER_STANDARD, TIER_STRONG)
+
+# Percentiles need a few samples before they mean anything
+MIN_LATENCY_SAMPLES = 10
+
+
+class LatencyTracker:
+    """Rolling window of the last `window` call latencies per model, none older than max_age seconds"""
+
+    def __init__(self, window=200, max_age=300.0):
+        self.window = window
+        self.max_age = max_age
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, seconds):
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self.window)
+            samples.append((time.monotonic(), seconds))
+
+    def p95(self, model):
+        """95th percentile latency in seconds, or None with too few recent samples"""
+        with self._lock:
+            timed = self._samples.get(model, ())
+            cutoff = time.monotonic() - self.max_age
+            while timed and timed[0][0] < cutoff:
+                timed.popleft()
+            samples = sorted(seconds for _recorded, seconds in timed)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def models(self):
+        with self._lock:
+            return list(self._samples)
+
+
+class ModelRouter:
+    """Picks the tier, model and output budget for each message"""
+
+    def __init__(self):
+        self.latency = LatencyTracker(
+            getattr(settings, 'GEMINI_ROUTER_LATENCY_WINDOW', 200),
+            getattr(settings, 'GEMINI_ROUTER_LATENCY_MAX_AGE', 300.0),
+        )
+        self.scorer = LexiconScorer()
+        self._decisions = Counter()
+        self._lock = threading.Lock()
+
+    def tiers(self, default_model):
+        return {
+            TIER_FAST: ModelTier(
+                TIER_FAST,
+                getattr(settings, 'GEMINI_FAST_MODEL', 'gemini-2.5-flash-lite'),
+                getattr(settings, 'GEMINI_FAST_MAX_TOKENS', 768),
+            ),
+            TIER_STANDARD: ModelTier(
+                TIER_STANDARD,
+                default_model,
+                getattr(settings, 'GEMINI_STANDARD_MAX_TOKENS', 2048),
+            ),
+            TIER_STRONG: ModelTier(
+                TIER_STRONG,
+                getattr(settings, 'GEMINI_STRONG_MODEL', 'gemini-2.5-pro'),
+                getattr(settings, 'GEMINI_STRONG_MAX_TOKENS', 4096),
+            ),
+        }
+
+    def route(self, user_message, context=None, default_model=None):
+        """RouteDecision for one message; default_model is the standard tier's model"""
+        tiers = self.tiers(default_model)
+        if not getattr(settings, 'GEMINI_ROUTING', True):
+            tier = tiers[TIER_STANDARD]
+            return RouteDecision(tier.name, tier.model, tier.max_output_tokens, 'routing disabled')
+
+        tier_name, reason = self._classify(user_message, context)
+
+        # Step down while the chosen tier's model is running too slow
+        p95_limit = getattr(settings, 'GEMINI_ROUTER_P95_LIMIT', 12.0)
+        while tier_name != TIER_FAST:
+            p95 = self.latency.p95(tiers[tier_name].model)
+            if p95 is None or p95 <= p95_limit:
+                break
+            faster = TIER_ORDER[TIER_ORDER.index(tier_name) - 1]
+            reason += f"; {tiers[tier_name].model} p95 {p95:.1f}s > {p95_limit:.1f}s, using {faster}"
+            tier_name = faster
+
+        tier = tiers[tier_name]
+        decision = RouteDecision(tier.name, tier.model, tier.max_output_tokens, reason)
+        with self._lock:
+            self._decisions[tier.name] += 1
+        logger.info(f"Routed message to {tier.name} tier ({tier.model}, {tier.max_output_tokens} tokens): {reason}")
+        return decision
+
+    def _classify(self, user_message, context):
+        """(tier name, reason) from the message and conversation alone"""
+        tokens = estimate_tokens(user_message)
+        sentiment, confidence = self.scorer.score(user_message)
+        depth = len(context.turns) if context is not None else 0
+        deep = depth >= getattr(settings, 'GEMINI_ROUTER_DEEP_TURNS', 8) or bool(context and context.summary)
+
+        if sentiment == 'negative' and confidence >= getattr(settings, 'GEMINI_ROUTER_DISTRESS_CONFIDENCE', 0.8):
+            return TIER_STRONG, f"high-intensity negative message ({confidence:.2f})"
+        if tokens >= getattr(settings, 'GEMINI_ROUTER_LONG_TOKENS', 200):
+            return TIER_STRONG, f"long message (~{tokens} tokens)"
+        if tokens <= getattr(settings, 'GEMINI_ROUTER_SHORT_TOKENS', 16) and sentiment != 'negative' and not deep:
+            return TIER_FAST, f"short check-in (~{tokens} tokens, {depth} turns in)"
+        return TIER_STANDARD, f"~{tokens} tokens, {sentiment}, {depth} turns in"
+
+    def record_latency(self, model, seconds):
+        self.latency.record(model, seconds)
+
+    def stats(self):
+        with self._lock:
+            decisions = dict(self._decisions)
+        return {
+            'decisions': decisions,
+            'p95_seconds': {model: self.latency.p95(model) for model in self.latency.models()},
+        }
+
+
+# Latency windows and decision counts are per process
+model_router = ModelRouter()
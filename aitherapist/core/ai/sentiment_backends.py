@@ -0,0 +1,233 @@
+# core/ai/sentiment_backends.py
+"""
+Sentiment inference backends.
+
+Every backend wraps a transformers text-classification pipeline and exposes the
+same contract: predict(texts) -> [(sentiment, confidence), ...]. The backend is
+selected with the SENTIMENT_BACKEND setting:
+
+- 'pytorch'       fp32 PyTorch model (reference)
+- 'pytorch-int8'  PyTorch model with int8 dynamic quantization of Linear layers
+- 'onnx'          model exported to ONNX and run with ONNX Runtime (needs optimum[onnxruntime])
+
+Messages longer than the model's token limit are split into overlapping token
+windows (at most max_windows per message) that are scored in the same batched
+pipeline call and combined with length-weighted scores.
+
+torch/transformers are only imported inside load(), never at module import.
+"""
+
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+SENTIMENT_LABELS = {'POSITIVE': 'positive', 'NEGATIVE': 'negative'}
+
+# DistilBERT's position embedding limit
+MAX_MODEL_TOKENS = 512
+
+
+class SentimentBackend:
+    """Base class - subclasses build the pipeline in _build_pipeline()"""
+
+    name = None
+
+    def __init__(self, model_name=SENTIMENT_MODEL, max_windows=8, window_overlap=64, batch_size=32):
+        self.model_name = model_name
+        self.max_windows = max(1, int(max_windows))
+        self.window_overlap = max(0, int(window_overlap))
+        self.batch_size = max(1, int(batch_size))
+        self.pipeline = None
+
+    def load(self):
+        self.pipeline = self._build_pipeline()
+        logger.info(f"Sentiment backend '{self.name}' loaded ({self.model_name})")
+        return self
+
+    def _build_pipeline(self):
+        raise NotImplementedError
+
+    def predict(self, texts):
+        """Score a list of texts in one pipeline call -> [(sentiment, confidence), ...]"""
+        texts = list(texts)
+        windows, owners, weights = self._split_windows(texts)
+        # Forward passes of at most batch_size windows, so peak memory stays
+        # bounded however many windows the call brings
+        outputs = self.pipeline(windows, batch_size=min(len(windows), self.batch_size), truncation=True)
+
+        # Length-weighted average of each label's score over a text's windows
+        label_scores = [{} for _ in texts]
+        total_weights = [0] * len(texts)
+        for results, owner, weight in zip(outputs, owners, weights):
+            total_weights[owner] += weight
+            for result in results:
+                scores = label_scores[owner]
+                scores[result['label']] = scores.get(result['label'], 0.0) + result['score'] * weight
+
+        scored = []
+        for scores, total in zip(label_scores, total_weights):
+            # Find the highest scoring sentiment
+            label, score = max(scores.items(), key=lambda item: item[1])
+            sentiment = SENTIMENT_LABELS.get(label, 'neutral')
+            scored.append((sentiment, float(score / total)))
+        return scored
+
+    def _split_windows(self, texts):
+        """
+        Split texts into model-sized pieces.
+        Returns (window_texts, owner_index_per_window, token_count_per_window).
+        Texts that fit are passed through unchanged as a single window.
+        """
+        tokenizer = self.pipeline.tokenizer
+        max_len = min(tokenizer.model_max_length, MAX_MODEL_TOKENS)
+        size = max_len - tokenizer.num_special_tokens_to_add()
+        step = max(1, size - min(self.window_overlap, size // 2))
+
+        token_ids = tokenizer(texts, add_special_tokens=False)['input_ids']
+
+        windows, owners, weights = [], [], []
+        for owner, (text, ids) in enumerate(zip(texts, token_ids)):
+            if len(ids) <= size:
+                windows.append(text)
+                owners.append(owner)
+                weights.append(max(1, len(ids)))
+                continue
+
+            starts = list(range(0, len(ids) - size + step, step))
+            if len(starts) > self.max_windows:
+                starts = self._spread(starts, self.max_windows)
+
+            for start in starts:
+                piece = ids[start:start + size]
+                windows.append(tokenizer.decode(piece))
+                owners.append(owner)
+                weights.append(len(piece))
+        return windows, owners, weights
+
+    @staticmethod
+    def _spread(starts, limit):
+        """Hard cap per message: keep `limit` evenly spaced windows, first and last included"""
+        if limit == 1:
+            return starts[:1]
+        last = len(starts) - 1
+        picks = sorted({round(i * last / (limit - 1)) for i in range(limit)})
+        return [starts[i] for i in picks]
+
+
+class PyTorchBackend(SentimentBackend):
+    """The original fp32 PyTorch pipeline"""
+
+    name = 'pytorch'
+
+    def _build_pipeline(self):
+        from transformers import pipeline
+
+        return pipeline(
+            "sentiment-analysis",
+            model=self.model_name,
+            return_all_scores=True
+        )
+
+
+class QuantizedPyTorchBackend(SentimentBackend):
+    """PyTorch pipeline with int8 dynamic quantization of the Linear layers"""
+
+    name = 'pytorch-int8'
+
+    def _build_pipeline(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        model.eval()
+        quantized = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+        return pipeline(
+            "sentiment-analysis",
+            model=quantized,
+            tokenizer=tokenizer,
+            return_all_scores=True
+        )
+
+
+class OnnxRuntimeBackend(SentimentBackend):
+    """
+    ONNX Runtime pipeline. The model is exported to export_dir on first use
+    and loaded from there afterwards.
+    """
+
+    name = 'onnx'
+
+    def __init__(self, model_name=SENTIMENT_MODEL, export_dir=None, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.export_dir = Path(export_dir) if export_dir else None
+
+    def _build_pipeline(self):
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError as e:
+            raise RuntimeError(
+                "The 'onnx' sentiment backend needs optimum[onnxruntime] installed."
+            ) from e
+        from transformers import AutoTokenizer, pipeline
+
+        if self.export_dir and (self.export_dir / "model.onnx").exists():
+            model = ORTModelForSequenceClassification.from_pretrained(self.export_dir)
+            tokenizer = AutoTokenizer.from_pretrained(self.export_dir)
+        else:
+            model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            if self.export_dir:
+                self.export_dir.mkdir(parents=True, exist_ok=True)
+                model.save_pretrained(self.export_dir)
+                tokenizer.save_pretrained(self.export_dir)
+                logger.info(f"Exported ONNX sentiment model to {self.export_dir}")
+
+        return pipeline(
+            "sentiment-analysis",
+            model=model,
+            tokenizer=tokenizer,
+            return_all_scores=True
+        )
+
+
+BACKENDS = {
+    PyTorchBackend.name: PyTorchBackend,
+    QuantizedPyTorchBackend.name: QuantizedPyTorchBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+}
+
+
+def backend_id(name=None):
+    """'<backend>:<model>' for the backend get_backend(name) builds - what its scores depend on"""
+    from django.conf import settings
+
+    name = name or getattr(settings, 'SENTIMENT_BACKEND', PyTorchBackend.name)
+    return f"{name}:{getattr(settings, 'SENTIMENT_MODEL', SENTIMENT_MODEL)}"
+
+
+def get_backend(name=None):
+    """Build (but do not load) the backend named by name or SENTIMENT_BACKEND"""
+    from django.conf import settings
+
+    name = name or getattr(settings, 'SENTIMENT_BACKEND', PyTorchBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown sentiment backend '{name}'. Choose one of: {', '.join(BACKENDS)}"
+        )
+
+    model_name = getattr(settings, 'SENTIMENT_MODEL', SENTIMENT_MODEL)
+    options = {
+        'max_windows': getattr(settings, 'SENTIMENT_MAX_WINDOWS', 8),
+        'window_overlap': getattr(settings, 'SENTIMENT_WINDOW_OVERLAP', 64),
+        'batch_size': getattr(settings, 'SENTIMENT_PIPELINE_BATCH_SIZE', 32),
+    }
+    if name == OnnxRuntimeBackend.name:
+        options['export_dir'] = getattr(settings, 'SENTIMENT_ONNX_DIR', None)
+    return BACKENDS[name](model_name, **options)
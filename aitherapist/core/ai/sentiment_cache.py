@@ -0,0 +1,133 @@
+# core/ai/sentiment_cache.py
+"""
+Bounded result cache for sentiment scoring.
+
+Keys are a hash of the normalized message text, so short repeated messages
+("hi", "thanks", "I'm fine") skip the transformer entirely. They are
+namespaced by the backend and model that produced the score, so switching
+either never serves the old labels. Entries live in a per-process LRU with a
+TTL; an optional Django cache alias can be configured as a shared second
+level so every worker on the node benefits.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """
+    Normalize text for cache lookups.
+    The model is uncased and ignores extra whitespace, so these variants
+    always score identically.
+    """
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+
+def cache_key(text, namespace=''):
+    digest = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+    return f'{namespace}:{digest}' if namespace else digest
+
+
+class SentimentCache:
+    """Thread-safe LRU + TTL cache of (sentiment, confidence) results"""
+
+    KEY_PREFIX = 'sentiment:'
+
+    def __init__(self, max_size=2048, ttl=3600, shared_alias=None, namespace=''):
+        """namespace: what the scores depend on, e.g. backend_id() ('onnx:distilbert-...')"""
+        self.max_size = max(0, int(max_size))
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self.namespace = namespace
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text):
+        """Return the cached result for text, or None"""
+        key = cache_key(text, self.namespace)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+
+        result = self._shared_get(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._local_set(key, result)
+        return result
+
+    def set(self, text, result):
+        key = cache_key(text, self.namespace)
+        self._local_set(key, result)
+        self._shared_set(key, result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def _local_set(self, key, result):
+        if self.max_size == 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (tuple(result), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _shared_backend(self):
+        if not self.shared_alias:
+            return None
+        from django.core.cache import caches
+        return caches[self.shared_alias]
+
+    def _shared_get(self, key):
+        try:
+            backend = self._shared_backend()
+            if backend is None:
+                return None
+            result = backend.get(self.KEY_PREFIX + key)
+            return tuple(result) if result is not None else None
+        except Exception as e:
+            logger.warning(f"Shared sentiment cache read failed: {e}")
+            return None
+
+    def _shared_set(self, key, result):
+        try:
+            backend = self._shared_backend()
+            if backend is not None:
+                backend.set(self.KEY_PREFIX + key, tuple(result), timeout=self.ttl or None)
+        except Exception as e:
+            logger.warning(f"Shared sentiment cache write failed: {e}")
@@ -1,57 +1,254 @@
 # core/ai_therapist.py
-import torch
-from transformers import pipeline
 import random
 import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .ai.batching import MicroBatcher
+from .ai.inference_server import InferenceClient, InferenceServerTimeout, InferenceServerUnavailable
+from .ai.lexicon import LexiconScorer, TOPIC_KEYWORDS
+from .ai.sentiment_backends import backend_id, get_backend
+from .ai.sentiment_cache import SentimentCache
 
 logger = logging.getLogger(__name__)
 
+# Result served while the model is still warming up (or failed to load)
+FALLBACK_SENTIMENT = ('neutral', 0.5)
+
+# Which tier of the cascade produced a result
+TIER_LEXICON = 'lexicon'
+TIER_TRANSFORMER = 'transformer'
+TIER_FALLBACK = 'fallback'
+# A transformer result served from the sentiment cache
+TIER_CACHE = 'cache'
+
+SentimentResult = namedtuple('SentimentResult', ['sentiment', 'confidence', 'tier'])
+
 
 class AITherapist:
-    """AI Therapist class for sentiment analysis and response generation"""
-    
-    def __init__(self):
-        try:
-            # Load sentiment analysis pipeline
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="distilbert-base-uncased-finetuned-sst-2-english",
-                return_all_scores=True
+    """AI Therapist class for sentiment analysis and response generation
+
+    The sentiment model is loaded lazily so that importing this module (and
+    therefore every management command) never touches torch/transformers.
+    Web entry points call ``warm_up()`` to load it in a background thread.
+
+    Scoring is a cascade: a lexicon/rule scorer answers first and only
+    messages it is unsure about (confidence below SENTIMENT_LEXICON_THRESHOLD)
+    are escalated to the transformer.
+
+    When SENTIMENT_SERVER_ADDRESS is set the instance runs in client mode:
+    scoring goes to the shared inference server, and the model is only loaded
+    in-process if the server is unavailable.
+    """
+
+    STATE_COLD = 'cold'
+    STATE_LOADING = 'loading'
+    STATE_READY = 'ready'
+    STATE_FAILED = 'failed'
+
+    def __init__(self, backend_name=None):
+        self.backend_name = backend_name
+        self.backend = None
+        self.batcher = None
+        self.cache = SentimentCache(
+            max_size=getattr(settings, 'SENTIMENT_CACHE_SIZE', 2048),
+            ttl=getattr(settings, 'SENTIMENT_CACHE_TTL', 3600),
+            shared_alias=getattr(settings, 'SENTIMENT_CACHE_ALIAS', None),
+            namespace=backend_id(backend_name),
+        )
+        self.client = None
+        server_address = getattr(settings, 'SENTIMENT_SERVER_ADDRESS', None)
+        if server_address:
+            self.client = InferenceClient(
+                server_address,
+                connect_timeout=getattr(settings, 'SENTIMENT_SERVER_CONNECT_TIMEOUT', 0.5),
+                timeout=getattr(settings, 'SENTIMENT_SERVER_TIMEOUT', 5.0),
             )
+        self._server_retry_at = 0.0
+        self.lexicon = LexiconScorer()
+        self.lexicon_threshold = getattr(settings, 'SENTIMENT_LEXICON_THRESHOLD', 0.9)
+        self.tier_counts = {TIER_LEXICON: 0, TIER_TRANSFORMER: 0, TIER_FALLBACK: 0, TIER_CACHE: 0}
+        self._stats_lock = threading.Lock()
+        self.state = self.STATE_COLD
+        self._load_lock = threading.Lock()
+        self._ready_event = threading.Event()
+
+    @property
+    def is_ready(self):
+        """True once the sentiment model is loaded and serving"""
+        return self.state == self.STATE_READY
+
+    def warm_up(self, background=True):
+        """
+        Start loading the sentiment model.
+        With background=True the load runs in a daemon thread and this returns
+        immediately; callers that need the model can use wait_until_ready().
+        """
+        with self._load_lock:
+            if self.state != self.STATE_COLD:
+                return
+            self.state = self.STATE_LOADING
+
+        if background:
+            thread = threading.Thread(
+                target=self._load_model, name='sentiment-warmup', daemon=True
+            )
+            thread.start()
+        else:
+            self._load_model()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until warm-up finishes (successfully or not)"""
+        self._ready_event.wait(timeout)
+        return self.is_ready
+
+    def _load_model(self):
+        try:
+            # Backends import torch/onnxruntime inside load(), so only
+            # processes that actually score text pay for it
+            self.backend = get_backend(self.backend_name).load()
+            self.batcher = self._build_batcher()
+            self.state = self.STATE_READY
             logger.info("Sentiment analyzer loaded successfully")
         except Exception as e:
             logger.error(f"Error loading sentiment analyzer: {e}")
-            self.sentiment_analyzer = None
-    
+            self.backend = None
+            self.state = self.STATE_FAILED
+        finally:
+            self._ready_event.set()
+
     def analyze_sentiment(self, text):
         """
         Analyze sentiment of user message
         Returns: (sentiment, confidence_score)
         """
-        if not self.sentiment_analyzer:
-            return 'neutral', 0.5
+        sentiment, confidence, _tier = self.analyze_sentiment_detailed(text)
+        return sentiment, confidence
+
+    def analyze_sentiment_detailed(self, text):
+        """
+        Analyze sentiment of user message through the cascade
+        Returns: SentimentResult(sentiment, confidence, tier)
+
+        Never blocks on model loading: until warm-up has finished escalated
+        messages get FALLBACK_SENTIMENT (and warm-up starts if nobody has yet).
+        Transformer results are cached by normalized text; fallbacks never are.
+        """
+        cached = self.cache.get(text)
+        if cached is not None:
+            return self._record(SentimentResult(*cached, TIER_CACHE))
+
+        sentiment, confidence = self.lexicon.score(text)
+        if confidence >= self.lexicon_threshold:
+            return self._record(SentimentResult(sentiment, confidence, TIER_LEXICON))
+
+        if self.client is not None and time.monotonic() >= self._server_retry_at:
+            try:
+                result = self.client.score([text])[0]
+                self.cache.set(text, result)
+                return self._record(SentimentResult(*result, TIER_TRANSFORMER))
+            except InferenceServerTimeout as e:
+                # The server is up but slow; loading the model here would only
+                # add load, so this message gets the fallback
+                logger.warning(f"Sentiment server timed out: {e}")
+                return self._record(SentimentResult(*FALLBACK_SENTIMENT, TIER_FALLBACK))
+            except InferenceServerUnavailable as e:
+                # Score in-process until it is time to try the server again
+                logger.warning(f"Sentiment server unavailable, scoring in-process: {e}")
+                self._server_retry_at = time.monotonic() + getattr(
+                    settings, 'SENTIMENT_SERVER_RETRY_INTERVAL', 30
+                )
+
+        if not self.is_ready:
+            if self.state == self.STATE_COLD:
+                self.warm_up(background=True)
+            return self._record(SentimentResult(*FALLBACK_SENTIMENT, TIER_FALLBACK))
         
         try:
-            results = self.sentiment_analyzer(text)[0]
-            
-            # Convert results to our format
-            sentiment_map = {'POSITIVE': 'positive', 'NEGATIVE': 'negative'}
-            
-            # Find the highest scoring sentiment
-            best_result = max(results, key=lambda x: x['score'])
-            sentiment = sentiment_map.get(best_result['label'], 'neutral')
-            confidence = best_result['score']
-            
-            return sentiment, confidence
+            if self.batcher is not None:
+                # Concurrent callers are coalesced into one padded forward pass
+                future = self.batcher.submit(text)
+                result = future.result(timeout=self._batch_timeout())
+            else:
+                result = self._score_batch([text])[0]
+
+            self.cache.set(text, result)
+            return self._record(SentimentResult(*result, TIER_TRANSFORMER))
             
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {e}")
-            return 'neutral', 0.5
+            return self._record(SentimentResult(*FALLBACK_SENTIMENT, TIER_FALLBACK))
+
+    def score_texts(self, texts):
+        """
+        Score many texts through the cascade in one go (no cache, no batcher).
+        Used by offline jobs; the model must already be loaded.
+        Returns: [SentimentResult, ...]
+        """
+        results = [None] * len(texts)
+        escalated = []
+        for i, text in enumerate(texts):
+            sentiment, confidence = self.lexicon.score(text)
+            if confidence >= self.lexicon_threshold:
+                results[i] = self._record(SentimentResult(sentiment, confidence, TIER_LEXICON))
+            else:
+                escalated.append(i)
+
+        if escalated:
+            scored = self._score_batch([texts[i] for i in escalated])
+            for i, result in zip(escalated, scored):
+                results[i] = self._record(SentimentResult(*result, TIER_TRANSFORMER))
+        return results
+
+    def tier_stats(self):
+        """
+        Per-tier counters and the share of scored messages escalated past the
+        lexicon (cache hits count as escalated: only transformer results are cached)
+        """
+        with self._stats_lock:
+            counts = dict(self.tier_counts)
+        scored = sum(counts.values())
+        escalated = counts[TIER_TRANSFORMER] + counts[TIER_FALLBACK] + counts[TIER_CACHE]
+        return {
+            **counts,
+            'escalation_rate': round(escalated / scored, 4) if scored else 0.0,
+        }
+
+    def _record(self, result):
+        with self._stats_lock:
+            self.tier_counts[result.tier] += 1
+        return result
+
+    def _score_batch(self, texts):
+        """Score a list of texts in one backend call -> [(sentiment, confidence), ...]"""
+        return self.backend.predict(texts)
+
+    def _build_batcher(self):
+        """Micro-batcher over _score_batch, or None when batching is disabled"""
+        max_batch_size = getattr(settings, 'SENTIMENT_BATCH_MAX_SIZE', 16)
+        if max_batch_size <= 1:
+            return None
+        return MicroBatcher(
+            self._score_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=getattr(settings, 'SENTIMENT_BATCH_MAX_WAIT_MS', 5),
+            max_queue_size=getattr(settings, 'SENTIMENT_BATCH_QUEUE_SIZE', 256),
+            name='sentiment-batcher',
+        )
+
+    @staticmethod
+    def _batch_timeout():
+        return getattr(settings, 'SENTIMENT_BATCH_TIMEOUT', 10.0)
     
-    def generate_response(self, user_message, sentiment, confidence):
+    def generate_response(self, user_message, sentiment, confidence, rng=None):
         """
-        Generate empathetic AI response based on sentiment
+        Generate empathetic AI response based on sentiment.
+        Pass a seeded random.Random as rng for reproducible picks.
         """
+        rng = rng or random
         responses = self._get_response_templates()
         
         # Select appropriate responses based on sentiment
@@ -66,10 +263,10 @@ class AITherapist:
             response_list = responses['neutral']
         
         # Select random response and personalize
-        base_response = random.choice(response_list)
+        base_response = rng.choice(response_list)
         
         # Add personalized touch based on keywords in user message
-        personalized_response = self._personalize_response(base_response, user_message, sentiment)
+        personalized_response = self._personalize_response(base_response, user_message, sentiment, rng)
         
         return personalized_response
     
@@ -99,40 +296,40 @@ class AITherapist:
             ]
         }
     
-    def _personalize_response(self, base_response, user_message, sentiment):
+    def _personalize_response(self, base_response, user_message, sentiment, rng=random):
         """Add personalization based on user message content"""
         user_message_lower = user_message.lower()
         
         # Add specific suggestions based on keywords
         suggestions = []
         
-        if any(word in user_message_lower for word in ['stress', 'stressed', 'overwhelmed', 'pressure']):
+        if any(word in user_message_lower for word in TOPIC_KEYWORDS['stress']):
             suggestions.extend([
                 "\n\n💡 Here's a quick stress-relief technique: Try the 4-7-8 breathing method - inhale for 4 counts, hold for 7, exhale for 8.",
                 "\n\n🧘‍♀️ When feeling overwhelmed, try grounding yourself: Name 5 things you can see, 4 you can touch, 3 you can hear, 2 you can smell, and 1 you can taste."
             ])
         
-        if any(word in user_message_lower for word in ['anxious', 'anxiety', 'worried', 'nervous']):
+        if any(word in user_message_lower for word in TOPIC_KEYWORDS['anxiety']):
             suggestions.extend([
                 "\n\n🌱 For anxiety, try this: Focus on your breath and remind yourself 'This feeling will pass.' You're stronger than you know.",
                 "\n\n💙 Anxiety can feel overwhelming, but remember: you've handled difficult situations before, and you can handle this too."
             ])
         
-        if any(word in user_message_lower for word in ['sad', 'depressed', 'down', 'lonely']):
+        if any(word in user_message_lower for word in TOPIC_KEYWORDS['sadness']):
             suggestions.extend([
                 "\n\n🌈 When feeling down, small acts of self-care can help: a warm cup of tea, a short walk, or calling someone you care about.",
                 "\n\n🤗 Remember that sadness is a natural emotion, and it's okay to feel this way. You matter, and this feeling is temporary."
             ])
         
-        if any(word in user_message_lower for word in ['work', 'job', 'career', 'boss']):
+        if any(word in user_message_lower for word in TOPIC_KEYWORDS['work']):
             suggestions.append("\n\n💼 Work challenges can be tough. Remember to set boundaries and take breaks when possible.")
         
-        if any(word in user_message_lower for word in ['relationship', 'friend', 'family', 'partner']):
+        if any(word in user_message_lower for word in TOPIC_KEYWORDS['relationship']):
             suggestions.append("\n\n💕 Relationships can be complex. Open, honest communication often helps, and remember that your feelings are valid.")
         
         # Add a random suggestion if applicable
         if suggestions:
-            base_response += random.choice(suggestions)
+            base_response += rng.choice(suggestions)
         
         return base_response
     
@@ -171,5 +368,14 @@ class AITherapist:
             return random.choice(strategies['general'])
 
 
-# Singleton instance
-ai_therapist = AITherapist()
\ No newline at end of file
+# Singleton instance (cheap to build; the model loads on warm_up())
+ai_therapist = AITherapist()
+
+
+def warm_up_if_enabled():
+    """Called from the WSGI/ASGI entry points, never from manage.py commands"""
+    # Thin workers in client mode leave the model to the inference server
+    if ai_therapist.client is not None:
+        return
+    if getattr(settings, 'SENTIMENT_WARMUP_ON_START', True):
+        ai_therapist.warm_up(background=True)
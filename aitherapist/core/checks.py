@@ -0,0 +1,31 @@
+# core/checks.py
+"""System checks for deployment settings the app depends on"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Warning, register
+
+from .shared_cache import SHARED_CACHE_ALIAS_SETTINGS, is_process_local
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """Cross-worker state on a per-process cache silently stops being shared"""
+    names_by_alias = {}
+    for name in SHARED_CACHE_ALIAS_SETTINGS:
+        names_by_alias.setdefault(getattr(settings, name, 'default'), []).append(name)
+
+    warnings = []
+    for alias, names in names_by_alias.items():
+        if alias in settings.CACHES and is_process_local(caches[alias]):
+            warnings.append(Warning(
+                f"Cache '{alias}' ({', '.join(names)}) uses {type(caches[alias]).__name__}, "
+                f"which is local to each process.",
+                hint=(
+                    "Set REDIS_URL (or point the alias at another shared cache) when running more "
+                    "than one worker; otherwise admission limits and idempotency are per worker and "
+                    "dashboards are only cached for DASHBOARD_LOCAL_CACHE_TTL seconds."
+                ),
+                id='core.W001',
+            ))
+    return warnings
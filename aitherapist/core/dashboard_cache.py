@@ -0,0 +1,71 @@
+# core/dashboard_cache.py
+"""
+Per-user cache of the computed dashboard context.
+
+The dashboard only changes when the user's chats do, so dashboard_view
+caches its whole context in the DASHBOARD_CACHE_ALIAS cache. Entries are
+keyed by a per-user version stamp kept in the same cache: the chat write
+path calls invalidate() once its transaction commits, which replaces the
+stamp, so every worker's next view misses and recomputes. Superseded
+entries are never read again and expire after DASHBOARD_CACHE_TTL seconds.
+
+Invalidation only reaches other workers (and rescore_sentiment) through a
+shared cache. On a per-process one the TTL is cut to DASHBOARD_LOCAL_CACHE_TTL
+so another worker's stale copy doesn't live long.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from .shared_cache import SharedCacheMixin, is_process_local
+
+KEY_PREFIX = 'dashboard'
+
+
+class DashboardCache(SharedCacheMixin):
+
+    alias_setting = 'DASHBOARD_CACHE_ALIAS'
+
+    def ttl(self):
+        ttl = getattr(settings, 'DASHBOARD_CACHE_TTL', 3600)
+        if is_process_local(self.cache):
+            return min(ttl, getattr(settings, 'DASHBOARD_LOCAL_CACHE_TTL', 30))
+        return ttl
+
+    def _version(self, user_id):
+        key = f'{KEY_PREFIX}:{user_id}:version'
+        version = self.cache.get(key)
+        if version is None:
+            # add() so concurrent first views agree on one stamp
+            self.cache.add(key, uuid.uuid4().hex, timeout=None)
+            version = self.cache.get(key)
+        return version
+
+    def key(self, user_id):
+        """
+        Cache key for the user's dashboard as of now. Take it before reading the
+        data: if a chat commits in between, the entry lands under a stale
+        version and is never served.
+        """
+        # The date is part of the key: the 30-day window moves at midnight
+        return f'{KEY_PREFIX}:{user_id}:{self._version(user_id)}:{timezone.now().date().isoformat()}'
+
+    def get(self, key):
+        """The cached dashboard context, or None"""
+        if self.ttl() <= 0:
+            return None
+        return self.cache.get(key)
+
+    def set(self, key, context):
+        if self.ttl() > 0:
+            self.cache.set(key, context, timeout=self.ttl())
+
+    def invalidate(self, user_id):
+        """Drop the user's cached dashboard on every worker"""
+        self.cache.set(f'{KEY_PREFIX}:{user_id}:version', uuid.uuid4().hex, timeout=None)
+
+
+# Written by the chat path and rescore_sentiment, read by dashboard_view
+dashboard_cache = DashboardCache()
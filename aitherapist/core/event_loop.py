@@ -0,0 +1,72 @@
+# core/event_loop.py
+"""
+A shared event loop for running the async chat pipeline under WSGI.
+
+The project is served over WSGI (runserver, gunicorn), where Django runs each
+async view on a throwaway event loop and reads an async StreamingHttpResponse
+body to the end before sending any of it. Two things break there:
+
+- streaming: every chunk and the `done` event arrive together at the end
+- the Gemini SDK's async (grpc.aio) clients are bound to the loop they were
+  first used on, and that loop is gone after the first request
+
+So under WSGI the views hand their LLM work to one long-lived loop per
+process, running in a daemon thread: arun() awaits a coroutine on it from any
+other loop, and iterate() serves an async generator to a WSGI worker one item
+at a time. Under ASGI the views run on the server's own loop and need neither.
+
+Both keep the ORM in the request's thread. run_coroutine_threadsafe carries
+the caller's context over to the loop, so thread-sensitive sync_to_async
+calls (every async ORM call) made there still go back to the thread that
+entered async_to_sync - Django's request thread - where the request's
+connection handling (close_old_connections, CONN_MAX_AGE) applies.
+"""
+
+import asyncio
+import threading
+
+from asgiref.sync import async_to_sync
+
+
+class BackgroundLoop:
+
+    def __init__(self, name):
+        self.name = name
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """The running loop, started on first use"""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    async def arun(self, coro):
+        """Await coro on this loop; cancelling the caller cancels it too"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def iterate(self, agen):
+        """
+        Sync iterator over an async generator driven on this loop. Each step
+        enters through async_to_sync, so the generator's ORM calls run in the
+        iterating thread rather than on asgiref's one shared executor thread.
+        """
+        step = async_to_sync(self.arun)
+        try:
+            while True:
+                try:
+                    yield step(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Finished, or the client went away: run the generator's cleanup
+            step(agen.aclose())
+
+
+# Started on first use under WSGI; never under ASGI
+background_loop = BackgroundLoop('async-pipeline-loop')
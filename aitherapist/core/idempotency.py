@@ -0,0 +1,139 @@
+# core/idempotency.py
+"""
+Idempotency keys for the chat endpoints.
+
+chat.js generates one key per message and sends it as the Idempotency-Key
+header on every attempt (retries, double submits, the streaming endpoint's
+JSON fallback). Keys are scoped to the user and kept in the
+IDEMPOTENCY_CACHE_ALIAS cache so all workers see them:
+
+- the first request with a key claims it and does the work
+- duplicates that arrive while it is in flight wait for its result
+  (single-flight) instead of generating a second response
+- once it completes, duplicates get the stored response for IDEMPOTENCY_TTL
+  seconds
+
+Claims and results carry a fingerprint of the request body: reusing a key
+for a different message raises IdempotencyKeyMismatch rather than replaying
+a response to something else. Failed requests release their claim, so a
+retry runs normally.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+import uuid
+
+from django.conf import settings
+
+from .shared_cache import SharedCacheMixin, request_lease
+
+KEY_PREFIX = 'idempotency'
+
+# Anything a client could reasonably send: UUIDs, ULIDs, random tokens
+_VALID_KEY = re.compile(r'^[A-Za-z0-9_\-:.]{8,128}$')
+
+
+class InvalidIdempotencyKey(Exception):
+    """The Idempotency-Key header is malformed"""
+
+
+class IdempotencyInProgress(Exception):
+    """The first request with this key is still running after the wait"""
+
+
+class IdempotencyKeyMismatch(Exception):
+    """The key was already used for a request with a different body"""
+
+
+def fingerprint(data):
+    """Hash of a parsed JSON request body, independent of key order and spacing"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class IdempotencyClaim:
+    """Ownership of a key by the request doing the work"""
+
+    def __init__(self, store, cache_key, token, request_fingerprint):
+        self.store = store
+        self.cache_key = cache_key
+        # The lock holds (token, fingerprint): duplicates check the body
+        # against it while the work is still in flight
+        self.lock_value = (token, request_fingerprint)
+        self.done = False
+
+    async def acomplete(self, response_json):
+        """Store the JSON response for duplicates and release the claim"""
+        cache = self.store.cache
+        await cache.aset(
+            f'{self.cache_key}:result', (self.lock_value[1], response_json), timeout=self.store.ttl()
+        )
+        await self._arelease()
+
+    async def aabandon(self):
+        """Give the key up without a result, so a retry does the work again"""
+        if not self.done:
+            await self._arelease()
+
+    async def _arelease(self):
+        self.done = True
+        cache = self.store.cache
+        if await cache.aget(f'{self.cache_key}:lock') == self.lock_value:
+            await cache.adelete(f'{self.cache_key}:lock')
+
+
+class IdempotencyStore(SharedCacheMixin):
+
+    alias_setting = 'IDEMPOTENCY_CACHE_ALIAS'
+
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'IDEMPOTENCY_TTL', 86400)
+
+    async def abegin(self, user_id, key, request_fingerprint):
+        """
+        Returns (claim, None) when this request should do the work, or
+        (None, response_json) when an earlier request with the key already
+        did - waiting for it if it is still running. request_fingerprint is
+        fingerprint() of the body; a different body under the same key raises
+        IdempotencyKeyMismatch.
+        """
+        if not _VALID_KEY.match(key):
+            raise InvalidIdempotencyKey("Idempotency-Key must be 8-128 letters, digits or -_:.")
+
+        cache = self.cache
+        cache_key = f'{KEY_PREFIX}:{user_id}:{key}'
+        lease = request_lease()
+        deadline = time.monotonic() + lease
+        delay = 0.05
+        while True:
+            stored = await cache.aget(f'{cache_key}:result')
+            if stored is not None:
+                stored_fingerprint, response_json = stored
+                _check_fingerprint(stored_fingerprint, request_fingerprint)
+                return None, response_json
+
+            claim = IdempotencyClaim(self, cache_key, uuid.uuid4().hex, request_fingerprint)
+            if await cache.aadd(f'{cache_key}:lock', claim.lock_value, timeout=lease):
+                return claim, None
+
+            held = await cache.aget(f'{cache_key}:lock')
+            if held is not None:
+                _check_fingerprint(held[1], request_fingerprint)
+
+            # Someone else is working on it - wait for their result
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+def _check_fingerprint(stored_fingerprint, request_fingerprint):
+    if stored_fingerprint != request_fingerprint:
+        raise IdempotencyKeyMismatch("This Idempotency-Key was already used for a different request.")
+
+
+# Used by both chat endpoints
+idempotency = IdempotencyStore()
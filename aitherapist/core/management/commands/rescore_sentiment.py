@@ -0,0 +1,194 @@
+# core/management/commands/rescore_sentiment.py
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.dashboard_cache import dashboard_cache
+from core.models import Chat, Conversation, MoodLog
+
+_worker_therapist = None
+
+
+def _init_worker(backend_name):
+    """Pool initializer - every worker process loads its own model once"""
+    global _worker_therapist
+    import django
+    django.setup()
+
+    from core.ai_therapist import AITherapist
+    _worker_therapist = AITherapist(backend_name)
+    _worker_therapist.warm_up(background=False)
+    if not _worker_therapist.is_ready:
+        raise RuntimeError("Could not load the sentiment backend")
+
+
+def _score_chunk(rows):
+    """rows: [(pk, text, ...), ...] -> [(row, (sentiment, confidence)), ...]"""
+    # Same lexicon -> transformer cascade as live scoring
+    results = _worker_therapist.score_texts([row[1] for row in rows])
+    return [(row, (result.sentiment, result.confidence)) for row, result in zip(rows, results)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-score the sentiment of every Chat with the current model and update "
+        "the affected MoodLog rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', default=None,
+                            help='Sentiment backend (default: SENTIMENT_BACKEND)')
+        parser.add_argument('--batch-size', type=int, default=256,
+                            help='Chats scored per model call (default: 256)')
+        parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                            help='Scoring processes (default: half the CPUs)')
+        parser.add_argument('--checkpoint', default=str(Path(settings.BASE_DIR) / 'rescore_sentiment.checkpoint.json'),
+                            help='Checkpoint file used to resume an interrupted run')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue from the checkpoint instead of starting over')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Score and report changes without writing anything')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.checkpoint_path = Path(options['checkpoint'])
+        batch_size = options['batch_size']
+
+        state = self._load_checkpoint() if options['resume'] else None
+        if state is None:
+            state = {'last_pk': 0, 'scanned': 0, 'changed': 0}
+        elif self.dry_run:
+            raise CommandError("--resume and --dry-run cannot be combined.")
+        else:
+            self.stdout.write(f"Resuming after Chat pk {state['last_pk']} ({state['scanned']} rows already done)")
+
+        started = time.perf_counter()
+        scanned_this_run = 0
+        affected_days = set()
+
+        with Pool(options['workers'], initializer=_init_worker, initargs=(options['backend'],)) as pool:
+            for scored in pool.imap(_score_chunk, self._chunks(state['last_pk'], batch_size)):
+                updates = []
+                changed_pks = []
+                deltas = defaultdict(Counter)
+                for (pk, _text, old_sentiment, user_id, day), (sentiment, confidence) in scored:
+                    updates.append(Chat(pk=pk, sentiment=sentiment, confidence_score=confidence))
+                    if sentiment != old_sentiment:
+                        state['changed'] += 1
+                        changed_pks.append(pk)
+                        deltas[(user_id, day)][MoodLog.counter_for(old_sentiment)] -= 1
+                        deltas[(user_id, day)][MoodLog.counter_for(sentiment)] += 1
+
+                affected_days |= deltas.keys()
+                state['last_pk'] = scored[-1][0][0]
+                state['scanned'] += len(scored)
+                scanned_this_run += len(scored)
+
+                if not self.dry_run:
+                    # Chats and their mood logs change together, so re-running a
+                    # chunk after a crash finds nothing left to change
+                    with transaction.atomic():
+                        Chat.objects.bulk_update(updates, ['sentiment', 'confidence_score'])
+                        self._apply_mood_deltas(deltas)
+                        self._refresh_last_sentiment(changed_pks)
+                        for user_id in {user_id for user_id, _day in deltas}:
+                            transaction.on_commit(lambda user_id=user_id: dashboard_cache.invalidate(user_id))
+                    self._save_checkpoint(state)
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"  pk <= {state['last_pk']}: {state['scanned']} scanned, "
+                    f"{state['changed']} changed, {scanned_this_run / elapsed:.1f} rows/s"
+                )
+
+        elapsed = time.perf_counter() - started
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"Dry run: {state['changed']} of {state['scanned']} chats would change sentiment "
+                f"across {len(affected_days)} user-days."
+            ))
+        else:
+            self.checkpoint_path.unlink(missing_ok=True)
+            self.stdout.write(self.style.SUCCESS(
+                f"Re-scored {state['scanned']} chats ({state['changed']} changed), "
+                f"updated mood logs for {len(affected_days)} user-days."
+            ))
+
+        rate = scanned_this_run / elapsed if elapsed else 0.0
+        self.stdout.write(f"Throughput: {scanned_this_run} rows in {elapsed:.1f}s ({rate:.1f} rows/s)")
+
+    def _chunks(self, after_pk, batch_size):
+        """Stream Chat rows in primary-key order, batch_size at a time"""
+        last_pk = after_pk
+        while True:
+            rows = list(
+                Chat.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'user_message', 'sentiment', 'user_id', 'timestamp')[:batch_size]
+            )
+            if not rows:
+                return
+            last_pk = rows[-1][0]
+            yield [
+                (pk, text, sentiment, user_id, timestamp.date().isoformat())
+                for pk, text, sentiment, user_id, timestamp in rows
+            ]
+
+    def _apply_mood_deltas(self, deltas):
+        """
+        Move each changed chat from its old sentiment counter to the new one.
+        Adjusting (rather than recounting) keeps counts for chats that have
+        since been deleted with their conversation.
+        """
+        for (user_id, day), delta in deltas.items():
+            if not any(delta.values()):
+                continue
+            updated = MoodLog.objects.filter(user_id=user_id, date=day).update(**{
+                field: F(field) + delta[field] for field in delta
+            })
+            if not updated:
+                # No log for that day (shouldn't happen) - rebuild it from the chats
+                counts = Counter(
+                    MoodLog.counter_for(sentiment) for sentiment in
+                    Chat.objects.filter(user_id=user_id, timestamp__date=day).values_list('sentiment', flat=True)
+                )
+                MoodLog.objects.create(
+                    user_id=user_id,
+                    date=day,
+                    total_chats=sum(counts.values()),
+                    **counts,
+                )
+
+    def _refresh_last_sentiment(self, chat_pks):
+        """Re-copy the newest chat's sentiment onto conversations with a re-scored chat"""
+        if not chat_pks:
+            return
+        latest = Chat.objects.filter(conversation=OuterRef('pk')).order_by('-timestamp', '-id')
+        Conversation.objects.filter(chats__pk__in=chat_pks).update(
+            last_sentiment=Coalesce(Subquery(latest.values('sentiment')[:1]), Value(''))
+        )
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path.exists():
+            return None
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read checkpoint {self.checkpoint_path}: {e}")
+
+    def _save_checkpoint(self, state):
+        # Write-then-rename so a crash never leaves a half-written checkpoint
+        tmp_path = self.checkpoint_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,54 @@
+# core/management/commands/run_sentiment_server.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ai.inference_server import DEFAULT_ADDRESS, build_server
+from core.ai.sentiment_backends import get_backend
+
+
+class Command(BaseCommand):
+    help = "Run the shared sentiment inference server that web workers score through"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address',
+                            default=getattr(settings, 'SENTIMENT_SERVER_ADDRESS', None) or DEFAULT_ADDRESS,
+                            help="'unix:/path/to.sock' or 'tcp://127.0.0.1:8765' "
+                                 f"(default: SENTIMENT_SERVER_ADDRESS, else {DEFAULT_ADDRESS})")
+        parser.add_argument('--allow-remote', action='store_true',
+                            help='Allow listening on a non-loopback TCP address. The server has no '
+                                 'authentication, so only do this on a private network.')
+        parser.add_argument('--backend', default=None,
+                            help='Sentiment backend (default: SENTIMENT_BACKEND)')
+        parser.add_argument('--max-batch-size', type=int, default=32)
+        parser.add_argument('--max-wait-ms', type=float,
+                            default=getattr(settings, 'SENTIMENT_BATCH_MAX_WAIT_MS', 5))
+        parser.add_argument('--max-queue-size', type=int, default=1024)
+
+    def handle(self, *args, **options):
+        address = options['address']
+
+        try:
+            backend = get_backend(options['backend']).load()
+        except Exception as e:
+            raise CommandError(f"Could not load sentiment backend: {e}")
+
+        try:
+            server = build_server(
+                address,
+                backend,
+                max_batch_size=options['max_batch_size'],
+                max_wait_ms=options['max_wait_ms'],
+                max_queue_size=options['max_queue_size'],
+                allow_remote=options['allow_remote'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Sentiment server ({backend.name}) listening on {address}"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
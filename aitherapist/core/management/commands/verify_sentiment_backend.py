@@ -0,0 +1,94 @@
+# core/management/commands/verify_sentiment_backend.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ai.sentiment_backends import BACKENDS, get_backend
+
+SAMPLE_TEXTS = [
+    "hi",
+    "thanks",
+    "I'm fine",
+    "ok",
+    "I had a really good day today, I finally finished my project!",
+    "I feel so stressed and overwhelmed with work lately.",
+    "My anxiety has been getting worse and I can't sleep.",
+    "I'm grateful for my friends, they always support me.",
+    "I've been feeling sad and lonely since we broke up.",
+    "Nothing really happened today.",
+    "My boss yelled at me in front of everyone and I felt humiliated.",
+    "I went for a walk and it helped me calm down a bit.",
+    "I don't know how I feel about my new job.",
+    "Everything is falling apart and I don't know what to do anymore.",
+    "I'm proud of myself for reaching out today.",
+    "My family doesn't understand me at all.",
+]
+
+
+class Command(BaseCommand):
+    help = "Check a candidate sentiment backend's agreement with the reference backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument('backend', choices=sorted(BACKENDS), help='Candidate backend to verify')
+        parser.add_argument('--reference', default='pytorch', choices=sorted(BACKENDS),
+                            help='Reference backend (default: pytorch)')
+        parser.add_argument('--samples', help='File with one sample message per line')
+        parser.add_argument('--min-agreement', type=float, default=0.95,
+                            help='Minimum fraction of matching labels (default: 0.95)')
+        parser.add_argument('--max-confidence-delta', type=float, default=0.05,
+                            help='Maximum mean absolute confidence difference (default: 0.05)')
+
+    def handle(self, *args, **options):
+        texts = self._load_samples(options['samples'])
+
+        reference, ref_seconds = self._run(options['reference'], texts)
+        candidate, cand_seconds = self._run(options['backend'], texts)
+
+        matches = 0
+        deltas = []
+        for text, ref, cand in zip(texts, reference, candidate):
+            if ref[0] == cand[0]:
+                matches += 1
+            else:
+                self.stdout.write(f"  mismatch: {text[:60]!r} {ref[0]} ({ref[1]:.3f}) vs {cand[0]} ({cand[1]:.3f})")
+            deltas.append(abs(ref[1] - cand[1]))
+
+        agreement = matches / len(texts)
+        mean_delta = sum(deltas) / len(deltas)
+
+        self.stdout.write(f"Samples:            {len(texts)}")
+        self.stdout.write(f"Label agreement:    {agreement:.2%}")
+        self.stdout.write(f"Mean |confidence Δ|: {mean_delta:.4f} (max {max(deltas):.4f})")
+        self.stdout.write(f"{options['reference']:>12}: {ref_seconds * 1000 / len(texts):.2f} ms/text")
+        self.stdout.write(f"{options['backend']:>12}: {cand_seconds * 1000 / len(texts):.2f} ms/text")
+
+        if agreement < options['min_agreement'] or mean_delta > options['max_confidence_delta']:
+            raise CommandError(
+                f"Backend '{options['backend']}' does not match '{options['reference']}' "
+                f"(agreement {agreement:.2%}, mean confidence delta {mean_delta:.4f})"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Backend '{options['backend']}' verified."))
+
+    def _load_samples(self, path):
+        if not path:
+            return SAMPLE_TEXTS
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                texts = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            raise CommandError(f"Could not read samples: {e}")
+        if not texts:
+            raise CommandError(f"No samples found in {path}")
+        return texts
+
+    def _run(self, name, texts):
+        try:
+            backend = get_backend(name).load()
+        except Exception as e:
+            raise CommandError(f"Could not load backend '{name}': {e}")
+
+        # One warm-up call so lazy initialisation isn't counted
+        backend.predict(texts[:1])
+        started = time.perf_counter()
+        results = backend.predict(texts)
+        return results, time.perf_counter() - started
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='engine',
+            field=models.CharField(choices=[('gemini', 'Gemini'), ('local', 'Local stand-in'), ('template', 'Template fallback')], default='gemini', max_length=10),
+        ),
+    ]
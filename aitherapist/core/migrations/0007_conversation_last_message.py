@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:52
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def backfill_last_message(apps, schema_editor):
+    """Copy each conversation's newest chat onto it in one UPDATE"""
+    Chat = apps.get_model('core', 'Chat')
+    Conversation = apps.get_model('core', 'Conversation')
+    latest = Chat.objects.filter(conversation=OuterRef('pk')).order_by('-timestamp', '-id')
+    Conversation.objects.update(
+        last_message_at=Coalesce(Subquery(latest.values('timestamp')[:1]), F('updated_at')),
+        last_preview=Coalesce(Substr(Subquery(latest.values('user_message')[:1]), 1, 100), Value('')),
+        last_sentiment=Coalesce(Subquery(latest.values('sentiment')[:1]), Value('')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_chat_engine'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_preview',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_sentiment',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user', '-last_message_at'], name='core_conv_user_last_msg_idx'),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+    ]
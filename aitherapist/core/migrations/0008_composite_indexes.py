@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_conversation_last_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['user', 'conversation', 'timestamp'], name='core_chat_user_conv_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['user', '-timestamp'], name='core_chat_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['conversation', '-timestamp', '-id'], name='core_chat_conv_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user', '-updated_at'], name='core_conv_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailverificationotp',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['user', 'otp_code', '-created_at'], name='core_otp_user_lookup_idx'),
+        ),
+    ]
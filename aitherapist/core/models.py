@@ -1,9 +1,13 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 import random
 
+from .dashboard_cache import dashboard_cache
+
 
 class UserProfile(models.Model):
     """Extended user profile with additional fields"""
@@ -22,13 +26,34 @@ class Conversation(models.Model):
     title = models.CharField(max_length=200, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(default=timezone.now)
+    # Rolling summary of turns too old for the prompt window (see core.ai.context)
+    summary = models.TextField(blank=True)
+    summarized_until = models.DateTimeField(null=True, blank=True)
+    # Newest message, denormalized for the chat sidebar (creation time until the first message)
+    last_message_at = models.DateTimeField(default=timezone.now)
+    last_preview = models.CharField(max_length=100, blank=True)
+    last_sentiment = models.CharField(max_length=10, blank=True)
+
+    # Fields note_message() sets, for save(update_fields=...)
+    LAST_MESSAGE_FIELDS = ['updated_at', 'last_message_at', 'last_preview', 'last_sentiment']
 
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='core_conv_user_updated_idx'),
+            models.Index(fields=['user', '-last_message_at'], name='core_conv_user_last_msg_idx'),
+        ]
 
     def __str__(self):
         return f"Conversation for {self.user.username} at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
+    def note_message(self, chat):
+        """Record chat as the conversation's newest message"""
+        self.updated_at = chat.timestamp
+        self.last_message_at = chat.timestamp
+        self.last_preview = chat.user_message[:self._meta.get_field('last_preview').max_length]
+        self.last_sentiment = chat.sentiment
+
 
 class Chat(models.Model):
     """Store chat conversations between user and AI"""
@@ -37,6 +62,14 @@ class Chat(models.Model):
         ('negative', 'Negative'),
         ('neutral', 'Neutral'),
     ]
+    ENGINE_GEMINI = 'gemini'
+    ENGINE_LOCAL = 'local'
+    ENGINE_TEMPLATE = 'template'
+    ENGINE_CHOICES = [
+        (ENGINE_GEMINI, 'Gemini'),
+        (ENGINE_LOCAL, 'Local stand-in'),
+        (ENGINE_TEMPLATE, 'Template fallback'),
+    ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, null=True, blank=True, related_name='chats')
@@ -45,13 +78,56 @@ class Chat(models.Model):
     sentiment = models.CharField(max_length=10, choices=SENTIMENT_CHOICES)
     confidence_score = models.FloatField(default=0.0)  # Sentiment confidence
     timestamp = models.DateTimeField(default=timezone.now)
+    engine = models.CharField(max_length=10, choices=ENGINE_CHOICES, default=ENGINE_GEMINI)  # Which engine answered
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # chat history of one conversation, the user's latest chats, and
+            # the prompt context window
+            models.Index(fields=['user', 'conversation', 'timestamp'], name='core_chat_user_conv_ts_idx'),
+            models.Index(fields=['user', '-timestamp'], name='core_chat_user_ts_idx'),
+            models.Index(fields=['conversation', '-timestamp', '-id'], name='core_chat_conv_ts_idx'),
+        ]
     
     def __str__(self):
         return f"Chat by {self.user.username} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
+    @classmethod
+    def record_turn(cls, user, conversation, user_message, ai_response, sentiment, confidence, engine):
+        """
+        Save one chat turn, point the conversation at it and count it in the
+        day's mood log, all in one transaction. Every write is a single
+        statement (no read-modify-write), so two tabs sending at once can't
+        lose an update. Returns the chat.
+        """
+        with transaction.atomic():
+            chat = cls.objects.create(
+                user=user,
+                conversation=conversation,
+                user_message=user_message,
+                ai_response=ai_response,
+                sentiment=sentiment,  # Stored for mood tracking and analytics
+                confidence_score=confidence,
+                engine=engine,
+            )
+
+            if conversation:
+                conversation.note_message(chat)
+                # Skip if a newer turn from another tab has already been recorded
+                Conversation.objects.filter(
+                    pk=conversation.pk, last_message_at__lte=chat.timestamp
+                ).update(**{field: getattr(conversation, field) for field in Conversation.LAST_MESSAGE_FIELDS})
+
+            MoodLog.update_or_create_daily_log(user, sentiment)
+            transaction.on_commit(lambda: dashboard_cache.invalidate(user.id))
+        return chat
+
+    @classmethod
+    async def arecord_turn(cls, *args, **kwargs):
+        """Async version of record_turn (the ORM has no async transactions)"""
+        return await sync_to_async(cls.record_turn)(*args, **kwargs)
+
 
 class MoodLog(models.Model):
     """Daily mood aggregation for analytics"""
@@ -63,6 +139,7 @@ class MoodLog(models.Model):
     total_chats = models.IntegerField(default=0)
     
     class Meta:
+        # Also the index for per-user date range queries
         unique_together = ('user', 'date')
         ordering = ['-date']
     
@@ -79,32 +156,31 @@ class MoodLog(models.Model):
         else:
             return 'neutral'
     
+    @staticmethod
+    def counter_for(sentiment):
+        """Counter field a chat of this sentiment is counted in"""
+        if sentiment in ('positive', 'negative'):
+            return f'{sentiment}_count'
+        return 'neutral_count'
+
     @classmethod
     def update_or_create_daily_log(cls, user, sentiment):
-        """Update or create daily mood log based on new chat sentiment"""
+        """
+        Count a new chat in today's mood log: an UPDATE with F() increments,
+        or an INSERT for the day's first chat
+        """
         today = timezone.now().date()
-        log, created = cls.objects.get_or_create(
-            user=user,
-            date=today,
-            defaults={
-                'positive_count': 0,
-                'negative_count': 0,
-                'neutral_count': 0,
-                'total_chats': 0
-            }
-        )
-        
-        # Increment the appropriate counter
-        if sentiment == 'positive':
-            log.positive_count += 1
-        elif sentiment == 'negative':
-            log.negative_count += 1
-        else:
-            log.neutral_count += 1
-        
-        log.total_chats += 1
-        log.save()
-        return log
+        counter = cls.counter_for(sentiment)
+        increments = {counter: F(counter) + 1, 'total_chats': F('total_chats') + 1}
+        if cls.objects.filter(user=user, date=today).update(**increments):
+            return
+        try:
+            # Savepoint, so losing the race doesn't break the caller's transaction
+            with transaction.atomic():
+                cls.objects.create(user=user, date=today, total_chats=1, **{counter: 1})
+        except IntegrityError:
+            # Another request created today's log first
+            cls.objects.filter(user=user, date=today).update(**increments)
 
 
 class EmailVerificationOTP(models.Model):
@@ -117,6 +193,16 @@ class EmailVerificationOTP(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Only unverified codes are ever looked up; Django renders the
+            # is_verified=False filter as NOT is_verified, which a plain column
+            # in the index couldn't match
+            models.Index(
+                fields=['user', 'otp_code', '-created_at'],
+                name='core_otp_user_lookup_idx',
+                condition=Q(is_verified=False),
+            ),
+        ]
     
     def __str__(self):
         return f"OTP for {self.email} - {self.otp_code}"
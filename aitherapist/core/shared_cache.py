@@ -0,0 +1,49 @@
+# core/shared_cache.py
+"""
+Caches holding state every worker has to agree on: admission slots,
+idempotency keys and the dashboard version stamps.
+
+These only work across processes on a shared backend (set REDIS_URL). A
+local-memory cache gives each process its own copy: limits are enforced per
+worker, duplicates landing on another worker aren't caught, and dashboard
+invalidations never leave the process that made them. The core.W001 system
+check warns about that, and the dashboard falls back to a short TTL.
+"""
+
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Settings naming the cache aliases that must be shared
+SHARED_CACHE_ALIAS_SETTINGS = ('ADMISSION_CACHE_ALIAS', 'IDEMPOTENCY_CACHE_ALIAS', 'DASHBOARD_CACHE_ALIAS')
+
+
+def is_process_local(cache):
+    """True for backends whose entries other processes can't see"""
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+
+def request_lease():
+    """
+    Seconds a claim made for one chat request may stay held: the LLM budget,
+    the admission queue wait and slack for saving the turn. A worker that dies
+    mid-request frees its claims after this long.
+    """
+    budget = getattr(settings, 'LLM_LATENCY_BUDGET', 20.0)
+    return math.ceil(budget + getattr(settings, 'ADMISSION_QUEUE_TIMEOUT', 5) + 30)
+
+
+class SharedCacheMixin:
+    """cache property for the alias named by the alias_setting setting (or an explicit alias)"""
+
+    alias_setting = None
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias or getattr(settings, self.alias_setting, 'default')]
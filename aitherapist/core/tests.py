@@ -1,3 +1,655 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth.models import User
+from django.core.checks import run_checks
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .ai import gemini_client, providers
+from .ai.admission import AdmissionController, AdmissionRejected
+from .ai.batching import BatchQueueFull, MicroBatcher
+from .ai.resilience import CircuitBreaker, CircuitOpenError
+from .ai.router import TIER_FAST, TIER_STANDARD, ModelRouter
+from .ai.sentiment_backends import SentimentBackend
+from .ai.sentiment_cache import SentimentCache
+from .ai_therapist import ai_therapist
+from .dashboard_cache import DashboardCache
+from .idempotency import IdempotencyKeyMismatch, IdempotencyStore, fingerprint
+from .models import Chat, Conversation, EmailVerificationOTP, MoodLog
+from .views import _history_page, _parse_history_cursor
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class QueryPlanTests(TestCase):
+    """
+    The hot queries must stay on an index: no full table scan, and no separate
+    sort step for their ORDER BY
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='x')
+        cls.conversation = Conversation.objects.create(user=cls.user)
+
+    def assertUsesIndex(self, queryset, table):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            # "SCAN core_chat" is a full table scan; "SCAN core_chat USING INDEX ..."
+            # and "SEARCH core_chat USING ..." are fine
+            if f'SCAN {table}' in line and 'USING' not in line:
+                self.fail(f"Full scan of {table}:\n{plan}")
+            if 'TEMP B-TREE FOR ORDER BY' in line:
+                self.fail(f"{table} rows are sorted outside the index:\n{plan}")
+        self.assertIn(table, plan)
+
+    def assertPageSeeks(self, cursor, constraint):
+        """_history_page reads core_chat_user_conv_ts_idx in order, seeking on constraint"""
+        with CaptureQueriesContext(connection) as queries:
+            _history_page(self.user, self.conversation, cursor)
+        plan = '\n'.join(
+            str(row[-1]) for row in
+            connection.cursor().execute(f"EXPLAIN QUERY PLAN {queries[0]['sql']}").fetchall()
+        )
+        self.assertIn('USING INDEX core_chat_user_conv_ts_idx', plan)
+        self.assertIn(constraint, plan)
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def test_conversation_history(self):
+        # chat_view: the first page, up to now
+        self.assertPageSeeks(None, 'conversation_id=?)')
+
+    def test_history_page(self):
+        # chat_history: a page before the cursor must seek to it, not walk every newer row
+        self.assertPageSeeks(_parse_history_cursor('1700000000000000-42'), 'conversation_id=? AND timestamp<?')
+
+    def test_recent_chats(self):
+        # dashboard_view
+        self.assertUsesIndex(Chat.objects.filter(user=self.user)[:10], 'core_chat')
+
+    def test_context_window(self):
+        # core.ai.context.abuild_context
+        queryset = Chat.objects.filter(conversation=self.conversation).order_by('-timestamp', '-id')[:21]
+        self.assertUsesIndex(queryset, 'core_chat')
+
+    def test_latest_conversation(self):
+        # _resolve_conversation / chat_view
+        self.assertUsesIndex(Conversation.objects.filter(user=self.user)[:1], 'core_conversation')
+
+    def test_conversation_sidebar(self):
+        queryset = Conversation.objects.filter(user=self.user).order_by('-last_message_at')[:20]
+        self.assertUsesIndex(queryset, 'core_conversation')
+
+    def test_mood_log_range(self):
+        end = timezone.now().date()
+        queryset = MoodLog.objects.filter(user=self.user, date__range=[end - timedelta(days=30), end]).order_by('date')
+        self.assertUsesIndex(queryset, 'core_moodlog')
+
+    def test_otp_lookup(self):
+        # EmailVerificationOTP.verify_otp
+        queryset = EmailVerificationOTP.objects.filter(
+            user=self.user, otp_code='123456', is_verified=False
+        ).order_by('-created_at')[:1]
+        self.assertUsesIndex(queryset, 'core_emailverificationotp')
+
+
+@override_settings(
+    LLM_PROVIDER='local',
+    LOCAL_LLM_LATENCY_MS=50,
+    LOCAL_LLM_CHUNK_CHARS=10,
+    LOCAL_LLM_CHUNK_INTERVAL_MS=100,
+    LLM_LATENCY_BUDGET=30,
+    ADMISSION_USER_RATE=0,
+)
+class StreamMessageTests(TransactionTestCase):
+    """The SSE endpoint must stream under WSGI, not buffer the whole response"""
+
+    def setUp(self):
+        providers._providers.clear()
+        self.addCleanup(providers._providers.clear)
+        # Keep scoring offline and deterministic: no transformer download
+        patcher = mock.patch.object(ai_therapist, 'analyze_sentiment', return_value=('neutral', 0.6))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('streamer', password='x')
+        self.client.force_login(self.user)
+
+    def test_first_event_arrives_before_generation_finishes(self):
+        response = self.client.post(
+            '/send-message/stream/',
+            data=json.dumps({'message': 'I had a long day at work and want to talk it through'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        arrivals = []
+        for event in response.streaming_content:
+            arrivals.append((time.monotonic(), event.decode() if isinstance(event, bytes) else event))
+        response.close()
+
+        self.assertTrue(arrivals[0][1].startswith('event: chunk'))
+        self.assertTrue(arrivals[-1][1].startswith('event: done'))
+        # Chunks come 100ms apart, so a streamed first chunk is well ahead of done
+        self.assertGreater(len(arrivals), 3)
+        self.assertGreater(arrivals[-1][0] - arrivals[0][0], 0.2)
+        chat = Chat.objects.get(user=self.user)
+        self.assertEqual((chat.sentiment, chat.confidence_score), ('neutral', 0.6))
+
+    def test_overlong_message_is_rejected(self):
+        for url in ('/send-message/', '/send-message/stream/'):
+            response = self.client.post(url, data=json.dumps({'message': 'a' * 1001}), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('at most 1000 characters', response.json()['error'])
+        self.assertFalse(Chat.objects.exists())
+
+    def test_turn_is_saved_in_the_request_thread(self):
+        # Not on asgiref's shared executor thread, where Django never closes
+        # stale connections and every stream's writes queue behind each other
+        threads = []
+        record_turn = Chat.record_turn
+
+        def recording(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return record_turn(*args, **kwargs)
+
+        with mock.patch.object(Chat, 'record_turn', side_effect=recording):
+            response = self.client.post(
+                '/send-message/stream/',
+                data=json.dumps({'message': 'I had a long day at work and want to talk it through'}),
+                content_type='application/json',
+            )
+            events = [event.decode() for event in response.streaming_content]
+            response.close()
+
+        self.assertTrue(events[-1].startswith('event: done'))
+        self.assertEqual(threads, [threading.current_thread()])
+
+
+@override_settings(ADMISSION_MAX_CONCURRENT=500, ADMISSION_MAX_QUEUED=500, ADMISSION_QUEUE_TIMEOUT=0, ADMISSION_CLAIM_PROBES=4)
+class AdmissionTests(TestCase):
+    """Claiming a slot costs a bounded number of cache round trips, not one per slot"""
+
+    def setUp(self):
+        self.controller = AdmissionController()
+        self.controller.cache.clear()
+        self.addCleanup(self.controller.cache.clear)
+
+    def test_full_limits_are_probed_a_few_times(self):
+        cache = self.controller.cache
+        with mock.patch.object(cache, 'aadd', mock.AsyncMock(return_value=False)) as aadd:
+            with self.assertRaises(AdmissionRejected):
+                async_to_sync(self.controller.aacquire)()
+        # 4 slot probes, then 4 queue probes
+        self.assertEqual(aadd.await_count, 8)
+
+    def test_acquire_and_release(self):
+        slot = async_to_sync(self.controller.aacquire)()
+        self.assertIsNotNone(slot)
+        async_to_sync(self.controller.arelease)(slot)
+        self.assertIsNone(self.controller.cache.get(slot[0]))
+
+
+class IdempotencyTests(TestCase):
+    """A key replays only the request it was first used for"""
+
+    def setUp(self):
+        self.store = IdempotencyStore()
+        self.store.cache.clear()
+        self.addCleanup(self.store.cache.clear)
+        self.key = 'msg-0123456789'
+
+    def test_same_body_is_replayed(self):
+        claim, _ = async_to_sync(self.store.abegin)(1, self.key, fingerprint({'message': 'hi', 'conversation_id': 3}))
+        async_to_sync(claim.acomplete)('{"response": "hello"}')
+        # Same body, different key order
+        claim, stored = async_to_sync(self.store.abegin)(1, self.key, fingerprint({'conversation_id': 3, 'message': 'hi'}))
+        self.assertIsNone(claim)
+        self.assertEqual(stored, '{"response": "hello"}')
+
+    def test_different_body_after_completion(self):
+        claim, _ = async_to_sync(self.store.abegin)(1, self.key, fingerprint({'message': 'hi'}))
+        async_to_sync(claim.acomplete)('{"response": "hello"}')
+        with self.assertRaises(IdempotencyKeyMismatch):
+            async_to_sync(self.store.abegin)(1, self.key, fingerprint({'message': 'something else'}))
+
+    def test_different_body_while_in_flight(self):
+        claim, _ = async_to_sync(self.store.abegin)(1, self.key, fingerprint({'message': 'hi'}))
+        self.assertIsNotNone(claim)
+        with self.assertRaises(IdempotencyKeyMismatch):
+            async_to_sync(self.store.abegin)(1, self.key, fingerprint({'message': 'something else'}))
+
+
+@override_settings(GEMINI_READ_TIMEOUT=0.1, GEMINI_MAX_RETRIES=2, GEMINI_BACKOFF_BASE=0.01)
+class GeminiRetryTests(TestCase):
+    """Calls held to the latency budget still count against the circuit breaker"""
+
+    def setUp(self):
+        self.breaker = CircuitBreaker('Gemini', failure_threshold=100)
+        patcher = mock.patch.object(gemini_client, 'gemini_breaker', self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    async def hang(timeout):
+        await asyncio.sleep(60)
+
+    def call(self, budget, caller_timeout=None):
+        async def run():
+            deadline = asyncio.get_running_loop().time() + budget
+            await asyncio.wait_for(gemini_client._acall_with_retries(self.hang, deadline=deadline), caller_timeout)
+        with self.assertRaises(asyncio.TimeoutError):
+            async_to_sync(run)()
+
+    def test_attempts_time_out_inside_the_budget_and_retry(self):
+        self.call(budget=0.5)
+        self.assertEqual(self.breaker.stats()['consecutive_failures'], 3)
+
+    @override_settings(GEMINI_READ_TIMEOUT=30)
+    def test_cancellation_at_the_deadline_is_a_failure(self):
+        self.call(budget=0.2, caller_timeout=0.2)
+        self.assertEqual(self.breaker.stats()['consecutive_failures'], 1)
+
+    def test_model_not_found_logs_the_catalogue(self):
+        error = Exception("404 models/gemini-9 is not found")
+        error.code = 404
+        with mock.patch.object(gemini_client.model_catalogue, 'suggestions', return_value=['gemini-2.5-flash']):
+            with self.assertLogs('core.ai.gemini_client', 'ERROR') as logs:
+                async_to_sync(gemini_client._alog_model_not_found)(error)
+        self.assertIn('gemini-2.5-flash', logs.output[0])
+
+
+@override_settings(GEMINI_ROUTING=True, GEMINI_ROUTER_P95_LIMIT=12, GEMINI_ROUTER_LATENCY_MAX_AGE=300)
+class ModelRouterTests(TestCase):
+    """A slow tier is stepped down only while its slow samples are recent"""
+
+    message = "Work has been a lot lately and I keep going over the same worries at night"
+
+    def test_step_down_ages_out(self):
+        router = ModelRouter()
+        self.assertEqual(router.route(self.message, default_model='gemini-2.5-flash').tier, TIER_STANDARD)
+
+        now = time.monotonic()
+        with mock.patch('core.ai.router.time.monotonic', return_value=now):
+            for _ in range(20):
+                router.record_latency('gemini-2.5-flash', 30.0)
+            self.assertEqual(router.route(self.message, default_model='gemini-2.5-flash').tier, TIER_FAST)
+
+        with mock.patch('core.ai.router.time.monotonic', return_value=now + 301):
+            self.assertEqual(router.route(self.message, default_model='gemini-2.5-flash').tier, TIER_STANDARD)
+            self.assertIsNone(router.latency.p95('gemini-2.5-flash'))
+
+    @override_settings(LLM_LATENCY_BUDGET=20)
+    def test_deadline_hits_count_as_the_whole_budget(self):
+        router = ModelRouter()
+        route = router.route(self.message, default_model='gemini-2.5-flash')
+
+        async def cut_off():
+            loop = asyncio.get_running_loop()
+            gemini_client._record_failed_latency(route, time.monotonic() - 2, asyncio.CancelledError(), loop.time())
+
+        with mock.patch.object(gemini_client, 'model_router', router):
+            for _ in range(10):
+                async_to_sync(cut_off)()
+        self.assertEqual(router.latency.p95('gemini-2.5-flash'), 20)
+
+
+@override_settings(GEMINI_PROMPT_CACHE=True)
+class PromptCacheTests(TestCase):
+    """Explicit prompt caching is only attempted when the instruction is big enough"""
+
+    def build(self, model_name, tokens):
+        client = gemini_client.GeminiClient()
+        counter = mock.Mock()
+        counter.count_tokens.return_value.total_tokens = tokens
+        with mock.patch.object(gemini_client.genai, 'GenerativeModel', return_value=counter), \
+                mock.patch.object(gemini_client.genai.caching.CachedContent, 'create') as create:
+            client._build_model(model_name)
+            client._build_model(model_name)
+        return create, counter
+
+    def test_small_instruction_skips_the_cache(self):
+        create, counter = self.build('gemini-2.5-flash', 700)
+        create.assert_not_called()
+        # Counted once per model, not on every build
+        self.assertEqual(counter.count_tokens.call_count, 1)
+
+    def test_large_instruction_is_cached(self):
+        create, _counter = self.build('gemini-2.5-flash', 1500)
+        self.assertEqual(create.call_count, 2)
+
+
+class SharedCacheTests(TestCase):
+    """Cross-worker state on a per-process cache is flagged and kept short-lived"""
+
+    def test_local_memory_cache_is_flagged(self):
+        self.assertIn('core.W001', [message.id for message in run_checks()])
+        self.assertEqual(DashboardCache().ttl(), 30)
+
+    def test_shared_cache_passes(self):
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/tmp/aitherapist-test-cache',
+        }}
+        with override_settings(CACHES=shared):
+            self.assertNotIn('core.W001', [message.id for message in run_checks()])
+            self.assertEqual(DashboardCache().ttl(), 3600)
+
+
+class MicroBatcherTests(SimpleTestCase):
+    """Concurrent submits are grouped into batched calls with per-item results"""
+
+    def setUp(self):
+        self.batches = []
+
+    def echo(self, items):
+        self.batches.append(list(items))
+        return [item * 10 for item in items]
+
+    def test_full_batch_flushes_without_waiting(self):
+        batcher = MicroBatcher(self.echo, max_batch_size=4, max_wait_ms=5000)
+        started = time.monotonic()
+        futures = [batcher.submit(i) for i in range(4)]
+        self.assertEqual([future.result(timeout=2) for future in futures], [0, 10, 20, 30])
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.batches, [[0, 1, 2, 3]])
+
+    def test_partial_batch_flushes_after_max_wait(self):
+        batcher = MicroBatcher(self.echo, max_batch_size=16, max_wait_ms=50)
+        futures = [batcher.submit(i) for i in range(3)]
+        self.assertEqual([future.result(timeout=2) for future in futures], [0, 10, 20])
+        self.assertEqual(self.batches, [[0, 1, 2]])
+
+    def test_errors_reach_every_caller_in_the_batch(self):
+        def fail(items):
+            raise ValueError("model exploded")
+
+        batcher = MicroBatcher(fail, max_batch_size=2, max_wait_ms=1000)
+        futures = [batcher.submit(i) for i in range(2)]
+        for future in futures:
+            with self.assertRaisesRegex(ValueError, "model exploded"):
+                future.result(timeout=2)
+
+    def test_wrong_result_count_is_an_error(self):
+        batcher = MicroBatcher(lambda items: items[:1], max_batch_size=2, max_wait_ms=1000)
+        futures = [batcher.submit(i) for i in range(2)]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=2)
+
+    def test_full_queue_rejects(self):
+        running, release = threading.Event(), threading.Event()
+
+        def block(items):
+            running.set()
+            release.wait(2)
+            return items
+
+        batcher = MicroBatcher(block, max_batch_size=1, max_wait_ms=0, max_queue_size=1)
+        self.addCleanup(release.set)
+        batcher.submit('in flight')
+        self.assertTrue(running.wait(2))
+        batcher.submit('queued')
+        with self.assertRaises(BatchQueueFull):
+            batcher.submit('one too many')
+
+
+class SentimentCacheTests(SimpleTestCase):
+    """Bounded LRU + TTL cache keyed by normalized text"""
+
+    def test_case_and_whitespace_share_an_entry(self):
+        cache = SentimentCache()
+        cache.set("I'm  fine,\n thanks ", ('positive', 0.9))
+        self.assertEqual(cache.get("i'm fine, THANKS"), ('positive', 0.9))
+        self.assertIsNone(cache.get("I'm not fine"))
+
+    def test_backends_do_not_share_entries(self):
+        pytorch = SentimentCache(shared_alias='default', namespace='pytorch:distilbert')
+        onnx = SentimentCache(shared_alias='default', namespace='onnx:distilbert')
+        self.addCleanup(pytorch._shared_backend().clear)
+        pytorch.set('hello', ('positive', 0.9))
+        self.assertIsNone(onnx.get('hello'))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = SentimentCache(max_size=2)
+        cache.set('one', ('neutral', 0.5))
+        cache.set('two', ('neutral', 0.5))
+        cache.get('one')
+        cache.set('three', ('neutral', 0.5))
+        self.assertIsNone(cache.get('two'))
+        self.assertIsNotNone(cache.get('one'))
+        self.assertIsNotNone(cache.get('three'))
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_entries_expire(self):
+        cache = SentimentCache(ttl=60)
+        now = time.monotonic()
+        with mock.patch('core.ai.sentiment_cache.time.monotonic', return_value=now):
+            cache.set('hello', ('positive', 0.8))
+            self.assertIsNotNone(cache.get('hello'))
+        with mock.patch('core.ai.sentiment_cache.time.monotonic', return_value=now + 61):
+            self.assertIsNone(cache.get('hello'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_shared_level_fills_the_local_one(self):
+        writer = SentimentCache(shared_alias='default')
+        reader = SentimentCache(shared_alias='default')
+        self.addCleanup(writer._shared_backend().clear)
+        writer.set('a shared message', ('negative', 0.7))
+        self.assertEqual(reader.get('a shared message'), ('negative', 0.7))
+        self.assertEqual(reader.get('a shared message'), ('negative', 0.7))
+        stats = reader.stats()
+        self.assertEqual((stats['shared_hits'], stats['hits']), (1, 1))
+
+
+class WordTokenizer:
+    """Stand-in tokenizer: one token per word, a 12-token model limit"""
+
+    model_max_length = 12
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {'input_ids': [text.split() for text in texts]}
+
+    def decode(self, ids):
+        return ' '.join(ids)
+
+
+class WordPipeline:
+    """Stand-in pipeline: POSITIVE score is the share of 'good' words in the window"""
+
+    tokenizer = WordTokenizer()
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, windows, batch_size=None, truncation=False):
+        self.batch_sizes.append(batch_size)
+        outputs = []
+        for window in windows:
+            words = window.split()
+            positive = words.count('good') / len(words)
+            outputs.append([
+                {'label': 'POSITIVE', 'score': positive},
+                {'label': 'NEGATIVE', 'score': 1 - positive},
+            ])
+        return outputs
+
+
+class SlidingWindowTests(SimpleTestCase):
+    """Long messages are scored as overlapping windows, capped and length-weighted"""
+
+    def backend(self, **kwargs):
+        backend = SentimentBackend(**kwargs)
+        backend.pipeline = WordPipeline()
+        return backend
+
+    @staticmethod
+    def words(count):
+        return ' '.join(f'w{i}' for i in range(count))
+
+    def test_short_text_is_one_window(self):
+        windows, owners, weights = self.backend()._split_windows(['fine thanks'])
+        self.assertEqual((windows, owners, weights), (['fine thanks'], [0], [2]))
+
+    def test_windows_overlap_and_reach_the_end(self):
+        # 10 tokens per window (12 minus 2 special), 4 shared with the next
+        windows, owners, weights = self.backend(window_overlap=4)._split_windows([self.words(22)])
+        pieces = [window.split() for window in windows]
+        self.assertEqual(len(pieces), 3)
+        for previous, current in zip(pieces, pieces[1:]):
+            self.assertEqual(previous[-4:], current[:4])
+        self.assertEqual(pieces[0][0], 'w0')
+        self.assertEqual(pieces[-1][-1], 'w21')
+        self.assertEqual(owners, [0, 0, 0])
+        self.assertEqual(weights, [10, 10, 10])
+
+    def test_window_count_is_capped_evenly(self):
+        windows, _owners, _weights = self.backend(max_windows=3, window_overlap=0)._split_windows([self.words(100)])
+        self.assertEqual([window.split()[0] for window in windows], ['w0', 'w40', 'w90'])
+        self.assertEqual(windows[-1].split()[-1], 'w99')
+
+    def test_spread(self):
+        self.assertEqual(SentimentBackend._spread(list(range(10)), 1), [0])
+        self.assertEqual(SentimentBackend._spread(list(range(10)), 4), [0, 3, 6, 9])
+
+    def test_scores_are_length_weighted(self):
+        backend = self.backend(window_overlap=0)
+        # One 10-token all-'good' window and one 5-token all-'bad' window
+        [(sentiment, confidence)] = backend.predict([' '.join(['good'] * 10 + ['bad'] * 5)])
+        self.assertEqual(sentiment, 'positive')
+        self.assertAlmostEqual(confidence, 10 / 15)
+
+    def test_texts_keep_their_own_windows(self):
+        backend = self.backend(window_overlap=0)
+        results = backend.predict(['good good', ' '.join(['bad'] * 30)])
+        self.assertEqual([sentiment for sentiment, _ in results], ['positive', 'negative'])
+
+    def test_forward_pass_batch_is_bounded(self):
+        backend = self.backend(max_windows=8, window_overlap=0, batch_size=3)
+        backend.predict([self.words(200)])
+        self.assertEqual(backend.pipeline.batch_sizes, [3])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """closed -> open after consecutive failures -> half-open probe -> closed or open"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('core.ai.resilience.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=30)
+
+    def open_circuit(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        # A success resets the count
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_one_probe_after_reset_timeout(self):
+        self.open_circuit()
+        self.now += 30
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        # Only one probe at a time
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_successful_probe_closes(self):
+        self.open_circuit()
+        self.now += 30
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.stats(), {'state': CircuitBreaker.CLOSED, 'consecutive_failures': 0})
+        self.breaker.before_call()
+
+    def test_failed_probe_reopens(self):
+        self.open_circuit()
+        self.now += 30
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_lost_probe_is_replaced(self):
+        self.open_circuit()
+        self.now += 30
+        self.breaker.before_call()
+        # The probe never reports back (e.g. cancelled)
+        self.now += 30
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+
+class MoodLogTests(TestCase):
+    """Daily mood counts are single-statement writes that survive a concurrent first chat"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('moody', password='x')
+
+    def test_first_chat_creates_then_increments(self):
+        MoodLog.update_or_create_daily_log(self.user, 'positive')
+        MoodLog.update_or_create_daily_log(self.user, 'neutral')
+        MoodLog.update_or_create_daily_log(self.user, 'unknown')
+        log = MoodLog.objects.get(user=self.user)
+        self.assertEqual((log.positive_count, log.neutral_count, log.negative_count, log.total_chats), (1, 2, 0, 3))
+
+    def test_losing_the_insert_race_still_counts(self):
+        # Another request inserts today's log between our UPDATE (0 rows) and INSERT
+        MoodLog.objects.create(user=self.user, date=timezone.now().date(), positive_count=1, total_chats=1)
+        missed = mock.Mock()
+        missed.update.return_value = 0
+        real_filter = MoodLog.objects.filter
+        calls = []
+
+        def filter(*args, **kwargs):
+            calls.append(kwargs)
+            return missed if len(calls) == 1 else real_filter(*args, **kwargs)
+
+        with mock.patch.object(MoodLog.objects, 'filter', side_effect=filter):
+            with transaction.atomic():
+                MoodLog.update_or_create_daily_log(self.user, 'negative')
+                # The IntegrityError was contained in its savepoint
+                self.assertEqual(MoodLog.objects.count(), 1)
+
+        log = MoodLog.objects.get(user=self.user)
+        self.assertEqual((log.positive_count, log.negative_count, log.total_chats), (1, 1, 2))
+
+
+@override_settings(LLM_PROVIDER='local')
+class HealthViewTests(TestCase):
+    """The health endpoint only shows internals to staff"""
+
+    def test_anonymous_gets_readiness_only(self):
+        health = self.client.get('/api/health/').json()
+        self.assertEqual(set(health), {'status', 'sentiment_ready'})
+        self.assertIn(health['status'], ('ok', 'warming'))
+
+    def test_staff_get_the_details(self):
+        self.client.force_login(User.objects.create_user('ops', password='x', is_staff=True))
+        health = self.client.get('/api/health/').json()
+        self.assertIn('sentiment_server', health)
+        self.assertIn('llm_usage', health)
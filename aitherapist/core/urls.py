@@ -22,5 +22,8 @@ urlpatterns = [
     
     # endpoints
     path('send-message/', views.send_message, name='send_message'),
+    path('send-message/stream/', views.stream_message, name='stream_message'),
+    path('chat/history/', views.chat_history, name='chat_history'),
     path('api/coping-strategy/', views.get_coping_strategy, name='get_coping_strategy'),
+    path('api/health/', views.health_view, name='health'),
 ]
\ No newline at end of file
@@ -1,25 +1,41 @@
 # core/views.py
+import asyncio
 import json
-from datetime import datetime, timedelta
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-from django.db.models import Count, Q, Max
-from django.db.models.functions import Coalesce
+from django.db.models import Count, Q
 from django.db.utils import OperationalError
 from django.contrib.auth.models import User
 
 from .forms import CustomUserCreationForm, UserProfileForm, ChatMessageForm
 from .models import UserProfile, Chat, MoodLog, EmailVerificationOTP, Conversation
-from .ai_therapist import ai_therapist 
-from .ai.gemini_client import get_gemini_response
+from .ai_therapist import ai_therapist, FALLBACK_SENTIMENT
+from .ai.admission import AdmissionRejected, admission
+from .ai.context import abuild_context
+from .ai.providers import get_provider
+from .dashboard_cache import dashboard_cache
+from .event_loop import background_loop
 from .email_utils import send_otp_email
+from .idempotency import (
+    IdempotencyInProgress, IdempotencyKeyMismatch, InvalidIdempotencyKey, fingerprint, idempotency,
+)
+
+logger = logging.getLogger(__name__)
+
+# Runs sentiment scoring alongside the Gemini call in the send views
+sentiment_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='sentiment')
 
 
 def home(request):
@@ -171,21 +187,22 @@ def chat_view(request):
             # Create a new conversation for the user
             conversation = Conversation.objects.create(user=request.user)
 
-        # Load chats for the conversation (ordered chronologically)
-        messages = Chat.objects.filter(user=request.user, conversation=conversation).order_by('timestamp')
+        # Load the newest page of chats (chronological); chat.js fetches older
+        # pages from chat_history as the user scrolls up
+        messages, history_cursor = _history_page(request.user, conversation)
 
-        # Recent conversations for sidebar - show all conversations, ordered by most recent activity
-        # Prefetch chats for efficient access (Chat model is already ordered by -timestamp)
+        # Recent conversations for sidebar, ordered by most recent activity. The
+        # last message is denormalized onto Conversation, so this is one indexed query
         recent_conversations = Conversation.objects.filter(
             user=request.user
-        ).annotate(
-            last_msg_time=Max('chats__timestamp'),
-            sort_time=Coalesce(Max('chats__timestamp'), 'updated_at')
-        ).prefetch_related('chats').order_by('-sort_time', '-updated_at')[:20]
+        ).only(
+            'id', 'last_message_at', 'last_preview', 'last_sentiment'
+        ).order_by('-last_message_at')[:20]
 
     except OperationalError:
         conversation = None
         messages = Chat.objects.filter(user=request.user).order_by('-timestamp')[:20]
+        history_cursor = None
         recent_conversations = []
 
     form = ChatMessageForm()
@@ -195,91 +212,461 @@ def chat_view(request):
         'form': form,
         'messages': messages,
         'conversation': conversation,
+        'history_cursor': history_cursor,
     }
     return render(request, 'core/chat.html', context)
 
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _history_cursor(chat):
+    """Opaque keyset cursor for "turns older than chat": '<timestamp in microseconds>-<id>'"""
+    delta = chat.timestamp - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return f"{micros}-{chat.id}"
+
+
+def _parse_history_cursor(cursor):
+    """(timestamp, id) from a cursor; raises ValueError if malformed"""
+    micros, chat_id = cursor.split('-')
+    return _EPOCH + timedelta(microseconds=int(micros)), int(chat_id)
+
+
+def _history_page(user, conversation, before=None):
+    """
+    One page of a conversation's turns in chronological order, plus the cursor
+    for the page before it (None on the first turn). Keyset pagination on
+    (timestamp, id) keeps each page a single indexed range read however long
+    the conversation is.
+    """
+    page_size = getattr(settings, 'CHAT_HISTORY_PAGE_SIZE', 20)
+    chats = Chat.objects.filter(user=user, conversation=conversation)
+    if before is not None:
+        timestamp, chat_id = before
+        # The redundant timestamp__lte lets the database seek straight to the
+        # cursor instead of walking every newer row to evaluate the OR
+        chats = chats.filter(timestamp__lte=timestamp).filter(
+            Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=chat_id)
+        )
+    page = list(
+        chats.order_by('-timestamp', '-id')
+        .only('id', 'user_message', 'ai_response', 'timestamp')[:page_size + 1]
+    )
+    cursor = _history_cursor(page[page_size - 1]) if len(page) > page_size else None
+    page = page[:page_size]
+    page.reverse()
+    return page, cursor
+
+
+@login_required
+def chat_history(request):
+    """Earlier turns of a conversation, one page per request (see _history_page)"""
+    try:
+        conversation = Conversation.objects.get(id=request.GET.get('conversation'), user=request.user)
+    except (Conversation.DoesNotExist, ValueError):
+        return JsonResponse({"error": "Conversation not found"}, status=404)
+
+    try:
+        before = _parse_history_cursor(request.GET.get('before', ''))
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    chats, cursor = _history_page(request.user, conversation, before)
+    return JsonResponse({
+        "success": True,
+        "messages": [
+            {
+                "user_message": chat.user_message,
+                "ai_response": chat.ai_response,
+                "timestamp": timezone.localtime(chat.timestamp).strftime("%H:%M"),
+            }
+            for chat in chats
+        ],
+        "next_cursor": cursor,
+    })
+
+
 @login_required
 @require_POST
-def send_message(request):
-    """Handle chat message sending."""
+async def send_message(request):
+    """Handle chat message sending.
+
+    Async so that, under ASGI, a slow Gemini call is just an awaited task
+    rather than a thread held for the whole generation; under WSGI the
+    pipeline runs on the shared background loop (see core.event_loop). The
+    LLM gets what is left of LLM_LATENCY_BUDGET; past that, or if it fails,
+    the local template engine answers instead.
+
+    With an Idempotency-Key header, duplicates of a message (retries, double
+    submits) get the first request's response instead of a new generation.
+    """
     try:
         data = json.loads(request.body)
         user_message = data.get("message", "").strip()
 
-        if not user_message:
-            return JsonResponse({"error": "Message cannot be empty"}, status=400)
+        error = _message_error(user_message)
+        if error:
+            return error
 
-        # Sentiment analysis - tracked for analytics but not displayed in UI
-        sentiment, confidence = ai_therapist.analyze_sentiment(user_message)
+        user = await request.auser()
 
-        # GOOGLE GEMINI RESPONSE
-        ai_response = get_gemini_response(user_message)
+        claim = None
+        key = request.headers.get("Idempotency-Key")
+        if key:
+            try:
+                claim, stored = await idempotency.abegin(user.id, key, fingerprint(data))
+            except (InvalidIdempotencyKey, IdempotencyInProgress, IdempotencyKeyMismatch) as e:
+                return _idempotency_error_response(e)
+            if stored is not None:
+                return _replayed_response(stored)
+
+        # The budget starts once this request owns the work, not while it
+        # waited on a duplicate
+        deadline = _response_deadline()
+        try:
+            response = await _run_pipeline(request, _process_message(user, data, user_message, deadline))
+            if claim and response.status_code == 200:
+                await claim.acomplete(response.content.decode())
+            return response
+        finally:
+            if claim:
+                await claim.aabandon()
 
-        # Associate chat with conversation if provided
-        conv_id = data.get('conversation_id')
-        conversation = None
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+    except Exception as e:
+        logger.error(f"Error sending message: {e}")
+        return JsonResponse({"error": "Failed to send message"}, status=500)
+
+
+def _message_error(user_message):
+    """
+    400 response for an empty message or one over ChatMessageForm's length
+    limit (checked before any scoring or generation), else None
+    """
+    if not user_message:
+        return JsonResponse({"error": "Message cannot be empty"}, status=400)
+    form = ChatMessageForm({"message": user_message})
+    if not form.is_valid():
+        return JsonResponse({"error": form.errors["message"][0]}, status=400)
+    return None
+
+
+async def _process_message(user, data, user_message, deadline):
+    """Generate, score and save one chat turn; returns the JsonResponse"""
+    # Shed load before doing any work for the message
+    try:
+        slot = await _admit(user)
+    except AdmissionRejected as e:
+        return _rejected_response(e)
+
+    try:
+        # Sentiment analysis - tracked for analytics but not displayed in UI.
+        # Runs concurrently with the Gemini call so latency is max(), not sum().
+        sentiment_task = _analyze_sentiment_async(user_message)
+
+        # Recent turns + rolling summary give the model memory of the conversation
+        conversation = await _resolve_conversation(user, data.get('conversation_id'))
+        context = await abuild_context(conversation)
+
+        ai_response, engine = await _generate_reply(user_message, context, sentiment_task, deadline)
+    finally:
+        await admission.arelease(slot)
+
+    sentiment, confidence = await _sentiment_by(sentiment_task, deadline)
+
+    chat = await Chat.arecord_turn(
+        user, conversation, user_message, ai_response, sentiment, confidence, engine
+    )
+
+    return JsonResponse(_chat_turn_payload(chat, conversation))
+
+
+def _run_pipeline(request, coro):
+    """
+    Await coro where the async LLM clients can live: the server's loop under
+    ASGI, the process's shared background loop under WSGI
+    """
+    if isinstance(request, WSGIRequest):
+        return background_loop.arun(coro)
+    return coro
+
+
+def _replayed_response(stored):
+    """The stored response of an earlier request with the same Idempotency-Key"""
+    response = HttpResponse(stored, content_type="application/json")
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _idempotency_error_response(e):
+    if isinstance(e, IdempotencyInProgress):
+        response = JsonResponse({"error": str(e)}, status=409)
+        response["Retry-After"] = "1"
+        return response
+    if isinstance(e, IdempotencyKeyMismatch):
+        return JsonResponse({"error": str(e)}, status=422)
+    return JsonResponse({"error": str(e)}, status=400)
+
+
+async def _admit(user):
+    """Per-user rate limit, then a global LLM slot; raises AdmissionRejected"""
+    await admission.acheck_user(user.id)
+    return await admission.aacquire()
+
+
+def _rejected_response(e):
+    """429 with a Retry-After hint for a request shed by admission control"""
+    response = JsonResponse({"error": str(e), "retry_after": e.retry_after}, status=429)
+    response["Retry-After"] = str(e.retry_after)
+    return response
+
+
+def _response_deadline():
+    """Event-loop time by which the reply must be ready"""
+    return asyncio.get_running_loop().time() + getattr(settings, 'LLM_LATENCY_BUDGET', 20.0)
+
+
+def _time_left(deadline):
+    return max(0.0, deadline - asyncio.get_running_loop().time())
+
+
+async def _generate_reply(user_message, context, sentiment_task, deadline):
+    """
+    (ai_response, engine): the LLM provider's reply, or the template engine's
+    if the provider fails or is still running at deadline (the call is cancelled).
+    """
+    provider = get_provider()
+    try:
+        ai_response = await asyncio.wait_for(
+            provider.aget_response(user_message, context, deadline=deadline), _time_left(deadline)
+        )
+        return ai_response, provider.name
+    except asyncio.TimeoutError:
+        logger.warning(f"LLM provider '{provider.name}' ran past the latency budget, using templates")
+    except Exception as e:
+        logger.error(f"LLM provider '{provider.name}' failed, using templates: {e}")
+    return await _template_reply(user_message, sentiment_task, deadline), Chat.ENGINE_TEMPLATE
+
+
+async def _template_reply(user_message, sentiment_task, deadline):
+    """Reply from AITherapist's local sentiment-aware templates"""
+    sentiment, confidence = await _sentiment_by(sentiment_task, deadline)
+    return ai_therapist.generate_response(user_message, sentiment, confidence)
+
+
+async def _sentiment_by(sentiment_task, deadline):
+    """
+    The message's (sentiment, confidence), or FALLBACK_SENTIMENT if scoring
+    is still running at deadline. The task itself carries on (shielded), so a
+    later call can still pick up its result.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.shield(sentiment_task), _time_left(deadline))
+    except asyncio.TimeoutError:
+        logger.warning("Sentiment scoring ran past the latency budget, using the fallback")
+        return FALLBACK_SENTIMENT
+
+
+def _analyze_sentiment_async(text):
+    """
+    Start scoring on the sentiment pool and return a task for the result.
+    Scoring starts immediately, so it overlaps with whatever the caller awaits next.
+    """
+    future = asyncio.wrap_future(sentiment_executor.submit(ai_therapist.analyze_sentiment, text))
+
+    async def result():
         try:
-            if conv_id:
-                try:
-                    conversation = Conversation.objects.get(id=conv_id, user=request.user)
-                except Conversation.DoesNotExist:
-                    conversation = None
+            return await future
+        except Exception as e:
+            logger.error(f"Error analyzing sentiment: {e}")
+            return FALLBACK_SENTIMENT
+
+    return asyncio.ensure_future(result())
 
+
+async def _resolve_conversation(user, conv_id):
+    """The conversation a message belongs to (created if needed), or None before migrations"""
+    # Associate chat with conversation if provided
+    conversation = None
+    try:
+        if conv_id:
+            try:
+                conversation = await Conversation.objects.aget(id=conv_id, user=user)
+            except Conversation.DoesNotExist:
+                conversation = None
+
+        if not conversation:
+            # Use latest conversation if exists else create new
+            conversation = await Conversation.objects.filter(user=user).afirst()
             if not conversation:
-                # Use latest conversation if exists else create new
-                conversation = Conversation.objects.filter(user=request.user).first()
-                if not conversation:
-                    conversation = Conversation.objects.create(user=request.user)
-        except OperationalError:
-            # Conversation table probably doesn't exist yet - fall back to no conversation
-            conversation = None
-
-        # Save chat with sentiment (stored for analytics, not displayed in UI)
-        chat = Chat.objects.create(
-            user=request.user,
-            conversation=conversation,
-            user_message=user_message,
-            ai_response=ai_response,
-            sentiment=sentiment,  # Stored for mood tracking and analytics
-            confidence_score=confidence,
-        )
+                conversation = await Conversation.objects.acreate(user=user)
+    except OperationalError:
+        # Conversation table probably doesn't exist yet - fall back to no conversation
+        conversation = None
+    return conversation
 
-        # Update conversation timestamp if conversation exists
-        if conversation:
-            conversation.updated_at = chat.timestamp
-            conversation.save()
 
-        # Update mood log for analytics dashboard
-        MoodLog.update_or_create_daily_log(request.user, sentiment)
+def _chat_turn_payload(chat, conversation):
+    return {
+        "success": True,
+        "ai_response": chat.ai_response,
+        "sentiment": chat.sentiment,  # Sent but not displayed in UI - used for analytics only
+        "confidence": round(chat.confidence_score, 2),
+        "timestamp": chat.timestamp.strftime("%H:%M"),
+        "conversation_id": conversation.id if conversation else None
+    }
+
+
+def _sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        return JsonResponse({
-            "success": True,
-            "ai_response": ai_response,
-            "sentiment": sentiment,  # Sent but not displayed in UI - used for analytics only
-            "confidence": round(confidence, 2),
-            "timestamp": chat.timestamp.strftime("%H:%M"),
-            "conversation_id": conversation.id if conversation else None
-        })
 
+@login_required
+@require_POST
+async def stream_message(request):
+    """Handle chat message sending, streaming the AI response as server-sent events.
+
+    Emits `chunk` events ({"text": ...}) as Gemini generates the response and a
+    final `done` event with the same payload send_message returns, once the
+    chat has been saved. The stream is held to LLM_LATENCY_BUDGET: if nothing
+    has arrived by then, or the LLM fails first, the template engine's reply is
+    sent instead; a stream that runs over after it started is cut short.
+    Idempotency-Key works as for send_message; duplicates get the stored
+    response replayed as a single chunk.
+    """
+    try:
+        data = json.loads(request.body)
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON data"}, status=400)
 
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+    user_message = data.get("message", "").strip()
+    error = _message_error(user_message)
+    if error:
+        return error
+
+    user = await request.auser()
+
+    claim = None
+    key = request.headers.get("Idempotency-Key")
+    if key:
+        try:
+            claim, stored = await idempotency.abegin(user.id, key, fingerprint(data))
+        except (InvalidIdempotencyKey, IdempotencyInProgress, IdempotencyKeyMismatch) as e:
+            return _idempotency_error_response(e)
+        if stored is not None:
+            return _sse_response(request, _replay_stream(stored))
+
+    # Decided up front so a shed request still gets a real 429; the slot (and
+    # idempotency claim) is released when the stream finishes, or by its lease
+    # if it never starts
+    deadline = _response_deadline()
+    try:
+        slot = await _admit(user)
+    except AdmissionRejected as e:
+        if claim:
+            await claim.aabandon()
+        return _rejected_response(e)
+
+    async def event_stream():
+        sentiment_task = _analyze_sentiment_async(user_message)
+        try:
+            conversation = await _resolve_conversation(user, data.get('conversation_id'))
+            context = await abuild_context(conversation)
+
+            provider = get_provider()
+            engine = provider.name
+            chunks = []
+            stream = provider.astream_response(user_message, context, deadline=deadline)
+            try:
+                while True:
+                    try:
+                        text = await asyncio.wait_for(stream.__anext__(), _time_left(deadline))
+                    except StopAsyncIteration:
+                        break
+                    chunks.append(text)
+                    yield _sse_event("chunk", {"text": text})
+            except asyncio.TimeoutError:
+                logger.warning(f"LLM provider '{provider.name}' stream ran past the latency budget")
+            except Exception as e:
+                logger.error(f"LLM provider '{provider.name}' stream failed: {e}")
+            finally:
+                await stream.aclose()
+
+            if not chunks:
+                # Nothing arrived in time - answer from the templates instead
+                engine = Chat.ENGINE_TEMPLATE
+                text = await _template_reply(user_message, sentiment_task, deadline)
+                chunks.append(text)
+                yield _sse_event("chunk", {"text": text})
+
+            ai_response = "".join(chunks).strip()
+            sentiment, confidence = await _sentiment_by(sentiment_task, deadline)
+
+            # Persist only once the whole response is known
+            chat = await Chat.arecord_turn(
+                user, conversation, user_message, ai_response, sentiment, confidence, engine
+            )
+            payload = _chat_turn_payload(chat, conversation)
+            if claim:
+                await claim.acomplete(json.dumps(payload))
+            yield _sse_event("done", payload)
+
+        except Exception as e:
+            logger.error(f"Error streaming message: {e}")
+            yield _sse_event("error", {"error": "Failed to send message"})
+
+        finally:
+            await admission.arelease(slot)
+            if claim:
+                await claim.aabandon()
+
+    return _sse_response(request, event_stream())
+
+
+async def _replay_stream(stored):
+    """Server-sent events for a response stored under an Idempotency-Key"""
+    payload = json.loads(stored)
+    yield _sse_event("chunk", {"text": payload["ai_response"]})
+    yield _sse_event("done", payload)
+
+
+def _sse_response(request, events):
+    if isinstance(request, WSGIRequest):
+        # WSGI would read an async body to the end before sending any of it;
+        # drive it on the background loop and hand over one event at a time
+        events = background_loop.iterate(events)
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop reverse proxies (nginx) from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 @login_required
 def dashboard_view(request):
-    """Dashboard with mood analytics"""
+    """Dashboard with mood analytics, cached per user until their next chat"""
+    key = dashboard_cache.key(request.user.id)
+    context = dashboard_cache.get(key)
+    if context is None:
+        context = _dashboard_context(request.user)
+        dashboard_cache.set(key, context)
+    return render(request, 'core/dashboard.html', context)
+
+
+def _dashboard_context(user):
+    """Compute the dashboard template context (plain data, so it can be cached)"""
     # Get date range (last 30 days)
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=30)
     
     # Get mood logs for the period
-    mood_logs = MoodLog.objects.filter(
-        user=request.user,
+    mood_logs = list(MoodLog.objects.filter(
+        user=user,
         date__range=[start_date, end_date]
-    ).order_by('date')
+    ).order_by('date'))
     
     # Prepare data for charts
     chart_data = []
@@ -300,14 +687,15 @@ def dashboard_view(request):
         total_stats['total'] += log.total_chats
     
     # Get recent chats
-    recent_chats = Chat.objects.filter(user=request.user)[:10]
+    recent_chats = [
+        {'timestamp': timestamp, 'sentiment': sentiment, 'user_message': message}
+        for timestamp, sentiment, message in
+        Chat.objects.filter(user=user).values_list('timestamp', 'sentiment', 'user_message')[:10]
+    ]
     
-    # Calculate weekly summary
+    # Calculate weekly summary (the last 7 days are already in mood_logs)
     week_ago = end_date - timedelta(days=7)
-    weekly_logs = MoodLog.objects.filter(
-        user=request.user,
-        date__gte=week_ago
-    )
+    weekly_logs = [log for log in mood_logs if log.date >= week_ago]
     
     weekly_stats = {
         'positive': sum(log.positive_count for log in weekly_logs),
@@ -327,9 +715,9 @@ def dashboard_view(request):
         mood_percentages = {'positive': 0, 'negative': 0, 'neutral': 0}
     
     # Generate insights
-    insights = generate_insights(request.user, weekly_stats, total_stats, mood_logs)
+    insights = generate_insights(user, weekly_stats, total_stats, mood_logs)
     
-    context = {
+    return {
         'chart_data': json.dumps(chart_data),
         'total_stats': total_stats,
         'weekly_stats': weekly_stats,
@@ -338,7 +726,6 @@ def dashboard_view(request):
         'insights': insights,
         'days_tracked': len(chart_data),
     }
-    return render(request, 'core/dashboard.html', context)
 
 @login_required
 def deleteAcc_view(request):
@@ -402,6 +789,28 @@ def get_coping_strategy(request):
     })
 
 
+def health_view(request):
+    """
+    Readiness probe - reports whether the sentiment model is loaded. Only
+    staff see the details (model state, server address, cache, routing and
+    usage stats); everyone else gets the readiness fields.
+    """
+    health = {
+        'status': 'ok' if ai_therapist.is_ready else 'warming',
+        'sentiment_ready': ai_therapist.is_ready,
+    }
+    if request.user.is_staff:
+        health.update({
+            'sentiment_model': ai_therapist.state,
+            'sentiment_server': ai_therapist.client.address if ai_therapist.client else None,
+            'sentiment_cache': ai_therapist.cache.stats(),
+            'sentiment_tiers': ai_therapist.tier_stats(),
+            'llm_provider': get_provider().name,
+            'llm_usage': get_provider().stats(),
+        })
+    return JsonResponse(health)
+
+
 def generate_insights(user, weekly_stats, total_stats, mood_logs):
     """Generate personalized insights for the user"""
     insights = []
@@ -523,12 +932,11 @@ def clear_chat(request):
         # Delete the conversation (this will cascade delete all associated Chat records)
         if conversation:
             conversation.delete()
+            # Its chats may be on the dashboard's recent list
+            dashboard_cache.invalidate(request.user.id)
 
         # Find the most recent remaining conversation, or create a new one
-        remaining_conv = Conversation.objects.filter(user=request.user).annotate(
-            last_msg_time=Max('chats__timestamp'),
-            sort_time=Coalesce(Max('chats__timestamp'), 'updated_at')
-        ).order_by('-sort_time', '-updated_at').first()
+        remaining_conv = Conversation.objects.filter(user=request.user).order_by('-last_message_at').first()
 
         if remaining_conv:
             # Redirect to most recent remaining conversation
@@ -12,6 +12,9 @@ document.addEventListener('DOMContentLoaded', function() {
     const clearChatBtn = document.getElementById('clearChat');
     const mainColumn = document.querySelector('.chat-main-column');
     let currentConversationId = mainColumn?.dataset?.conversationId || null;
+    // Keyset cursor for the next page of older messages (empty when there are none)
+    let historyCursor = chatMessages.dataset.historyCursor || '';
+    let loadingHistory = false;
     
     // Initialize chat functionality
     initializeChat();
@@ -51,6 +54,53 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Auto-resize input
         messageInput.addEventListener('input', autoResizeInput);
+        
+        // Load older messages when scrolled near the top
+        messagesContainer.addEventListener('scroll', function() {
+            if (messagesContainer.scrollTop < 200) {
+                loadOlderMessages();
+            }
+        });
+        // Keep loading until the first page overflows the container
+        setTimeout(fillMessagesContainer, 150);
+    }
+    
+    async function loadOlderMessages() {
+        if (!historyCursor || loadingHistory || !currentConversationId) return false;
+        loadingHistory = true;
+        
+        try {
+            const params = new URLSearchParams({ conversation: currentConversationId, before: historyCursor });
+            const response = await fetch(`/chat/history/?${params}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const data = await response.json();
+            
+            // Prepend the page, keeping the messages in view where they were
+            const fragment = document.createDocumentFragment();
+            data.messages.forEach(chat => {
+                fragment.appendChild(createMessageElement('user', chat.user_message, chat.timestamp));
+                fragment.appendChild(createMessageElement('ai', chat.ai_response || 'No response available', ''));
+            });
+            const previousHeight = messagesContainer.scrollHeight;
+            chatMessages.insertBefore(fragment, chatMessages.firstChild);
+            messagesContainer.scrollTop += messagesContainer.scrollHeight - previousHeight;
+            
+            historyCursor = data.next_cursor || '';
+            return true;
+        } catch (error) {
+            console.error('Error loading older messages:', error);
+            return false;
+        } finally {
+            loadingHistory = false;
+        }
+    }
+    
+    async function fillMessagesContainer() {
+        while (messagesContainer.scrollHeight <= messagesContainer.clientHeight && await loadOlderMessages()) {
+            scrollToBottom();
+        }
     }
     
     async function handleMessageSubmit(e) {
@@ -76,15 +126,40 @@ document.addEventListener('DOMContentLoaded', function() {
             // Show typing indicator
             showTypingIndicator();
             
-            // Send message to server
-            const response = await sendMessageToServer(message);
+            // One key per message, reused by every attempt to send it, so the
+            // server answers duplicates with the first result
+            const idempotencyKey = newIdempotencyKey();
+            
+            // Stream the response from the server, rendering it as it arrives
+            let aiMessageElement = null;
+            let streamedText = '';
+            let response;
+            try {
+                response = await streamMessageToServer(message, idempotencyKey, function(text) {
+                    if (!aiMessageElement) {
+                        // First chunk - swap the typing indicator for the AI message
+                        hideTypingIndicator();
+                        aiMessageElement = addAIMessage('', null, null);
+                    }
+                    streamedText += text;
+                    updateAIMessage(aiMessageElement, streamedText);
+                });
+            } catch (error) {
+                // Network failure before anything arrived: retry once with the same key
+                if (aiMessageElement || !(error instanceof TypeError)) throw error;
+                response = await sendMessageToServer(message, idempotencyKey);
+            }
             
             if (response.success) {
                 // Hide typing indicator
                 hideTypingIndicator();
                 
-                // Add AI response
-                addAIMessage(response.ai_response, response.sentiment, response.timestamp);
+                // Render the final (saved) response
+                if (aiMessageElement) {
+                    updateAIMessage(aiMessageElement, response.ai_response);
+                } else {
+                    addAIMessage(response.ai_response, response.sentiment, response.timestamp);
+                }
                 
                 // Update current conversation id if server returned one
                 if (response.conversation_id) {
@@ -101,14 +176,94 @@ document.addEventListener('DOMContentLoaded', function() {
         } catch (error) {
             console.error('Error sending message:', error);
             hideTypingIndicator();
-            showError('Sorry, there was an error sending your message. Please try again.');
+            showError(error.userMessage || 'Sorry, there was an error sending your message. Please try again.');
         } finally {
             setFormLoading(false);
             messageInput.focus();
         }
     }
     
-    async function sendMessageToServer(message) {
+    function newIdempotencyKey() {
+        if (window.crypto && window.crypto.randomUUID) {
+            return window.crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+    }
+    
+    async function streamMessageToServer(message, idempotencyKey, onChunk) {
+        // POST the message and read the server-sent event stream.
+        // Calls onChunk(text) per chunk and resolves with the final "done" payload.
+        const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
+        
+        const payload = { message: message };
+        if (currentConversationId) payload.conversation_id = currentConversationId;
+        
+        const response = await fetch('/send-message/stream/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+                'X-CSRFToken': csrfToken,
+                'Idempotency-Key': idempotencyKey
+            },
+            body: JSON.stringify(payload)
+        });
+        
+        if (!response.ok) {
+            throw await httpError(response);
+        }
+        
+        // Browsers without streaming fetch bodies: fall back to the JSON endpoint
+        // (same key, so the server returns this request's result rather than a new one)
+        if (!response.body || !window.TextDecoder) {
+            return await sendMessageToServer(message, idempotencyKey);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = null;
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const event = parseServerSentEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (!event) continue;
+                
+                if (event.type === 'chunk') {
+                    onChunk(event.data.text);
+                } else if (event.type === 'done') {
+                    result = event.data;
+                } else if (event.type === 'error') {
+                    result = { success: false, error: event.data.error };
+                }
+            }
+        }
+        
+        return result || { success: false, error: 'The response stream ended unexpectedly' };
+    }
+    
+    function parseServerSentEvent(raw) {
+        let type = 'message';
+        const dataLines = [];
+        raw.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        if (!dataLines.length) return null;
+        return { type: type, data: JSON.parse(dataLines.join('\n')) };
+    }
+    
+    async function sendMessageToServer(message, idempotencyKey) {
         const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
         
         const payload = { message: message };
@@ -118,18 +273,30 @@ document.addEventListener('DOMContentLoaded', function() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'X-CSRFToken': csrfToken
+                'X-CSRFToken': csrfToken,
+                'Idempotency-Key': idempotencyKey
             },
             body: JSON.stringify(payload)
         });
         
         if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+            throw await httpError(response);
         }
         
         return await response.json();
     }
     
+    async function httpError(response) {
+        const error = new Error(`HTTP error! status: ${response.status}`);
+        if (response.status === 429) {
+            // Rate limited or the server is shedding load - say when to try again
+            const data = await response.json().catch(() => ({}));
+            const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 1;
+            error.userMessage = `${data.error || 'Too many messages.'} Please wait ${retryAfter} second${retryAfter === 1 ? '' : 's'} and try again.`;
+        }
+        return error;
+    }
+    
     function addUserMessage(message) {
         const messageElement = createMessageElement('user', message, new Date().toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'}));
         chatMessages.appendChild(messageElement);
@@ -142,6 +309,13 @@ document.addEventListener('DOMContentLoaded', function() {
         const messageElement = createMessageElement('ai', message, '', null);
         chatMessages.appendChild(messageElement);
         scrollToBottom();
+        return messageElement;
+    }
+    
+    function updateAIMessage(messageElement, message) {
+        // Re-render a streaming AI message with the text received so far
+        messageElement.querySelector('.message-content p').innerHTML = formatMessage(message);
+        scrollToBottom();
     }
     
     function createMessageElement(sender, message, timestamp, sentiment = null) {